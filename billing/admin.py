@@ -1,29 +1,103 @@
-from django.contrib import admin
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.utils import timezone
+
+from inventory.pagination import EstimatedCountPaginator
+from . import exports, invoices
 from .models import Customer, Order, OrderItem, Payment
 
+# Changelists of the big tables: estimated page counts for unfiltered lists
+# (no COUNT(*) over every row), no second unfiltered count beside a filtered
+# one, related rows joined instead of fetched per row, and raw id inputs
+# instead of <select>s listing every customer, product or order. "^" search
+# fields are prefix matches served by the NOCASE indexes declared on the models.
+
+class PrefixSearchMixin:
+    """
+    Search "^field" prefixes one field at a time: each becomes its own pk
+    subquery, which SQLite answers from that field's index. Django's single
+    OR across joined tables leaves it no index to use and scans every row.
+    The whole term is one prefix ("Customer 12", an invoice number).
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = Q()
+        for field in self.search_fields:
+            lookup = {f"{field.lstrip('^')}__istartswith": term}
+            matches |= Q(pk__in=self.model._default_manager.filter(**lookup).values("pk"))
+        return queryset.filter(matches), False
+
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ("name", "phone", "email", "created_at")
     search_fields = ("name", "phone", "email")
+    actions = exports.admin_actions(exports.CUSTOMERS)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ("line_total",)
+    raw_id_fields = ("product",)
+
+    def get_queryset(self, request):
+        # each row prints the item (product name) next to its form
+        return super().get_queryset(request).select_related("product")
 
 class PaymentInline(admin.TabularInline):
     model = Payment
     extra = 0
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ("invoice_number", "customer", "date", "subtotal", "tax", "discount", "total", "payment_status")
-    search_fields = ("invoice_number", "customer__name")
+class OrderAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ("invoice_number", "customer", "date", "subtotal", "tax", "discount", "total", "balance", "payment_status")
+    list_select_related = ("customer",)
+    search_fields = ("^invoice_number", "^customer__name")
     list_filter = ("payment_status", "date")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    raw_id_fields = ("customer",)
     inlines = [OrderItemInline, PaymentInline]
-    readonly_fields = ("invoice_number", "subtotal", "total")
+    readonly_fields = ("invoice_number", "subtotal", "total", "amount_paid", "balance")
+    actions = ["generate_invoice_pdfs", *exports.admin_actions(exports.ORDERS)]
+
+    @admin.action(description="Generate invoice PDFs in the background")
+    def generate_invoice_pdfs(self, request, queryset):
+        order_ids = [str(pk) for pk in queryset.values_list("pk", flat=True)]
+        workers = getattr(settings, "INVOICE_BATCH_WORKERS", os.cpu_count() or 1)
+        log_path = os.path.join(settings.INVOICE_STORAGE_PATH, f"batch-{timezone.now():%Y%m%d-%H%M%S}.log")
+        # manage.py render_invoices in its own process and session: the render pool is
+        # not forked from this threaded server, and a server restart does not end the batch
+        with open(log_path, "ab") as log:
+            subprocess.Popen(
+                [
+                    sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "render_invoices",
+                    "--workers", str(workers), "--base-url", request.build_absolute_uri("/"), "--ids", *order_ids,
+                ],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+            )
+        self.message_user(
+            request,
+            f"Rendering {len(order_ids)} invoice(s) into {settings.INVOICE_STORAGE_PATH} in the background; "
+            f"failures are listed in {log_path}.",
+            messages.INFO,
+        )
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = ("order", "amount", "method", "date", "reference")
-    search_fields = ("order__invoice_number", "reference")
+    list_select_related = ("order",)
+    search_fields = ("^order__invoice_number", "^reference")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    raw_id_fields = ("order",)
+    actions = exports.admin_actions(exports.PAYMENTS)
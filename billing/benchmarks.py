@@ -0,0 +1,376 @@
+"""
+Benchmark harness for the inventory and billing hot paths.
+
+seed() fills a database with synthetic products, customers, orders and
+payments at one of SCALES; run() drives each scenario through the Django
+test client for a number of rounds and returns latency percentiles and
+query counts per scenario as a JSON-able baseline; compare() diffs two
+baselines. The ``benchmark`` management command ties these together on a
+separate SQLite file so the working database is never touched.
+"""
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory import ledger
+from inventory.models import Category, Product
+from . import rollups
+from .models import Customer, InvoiceSequence, Order, OrderItem, Payment
+from .numbering import format_number, invoice_day
+
+SCALES = {
+    "smoke": {"products": 200, "customers": 20, "orders": 200, "categories": 5},
+    "10k": {"products": 10_000, "customers": 1_000, "orders": 10_000, "categories": 50},
+    "100k": {"products": 100_000, "customers": 10_000, "orders": 100_000, "categories": 200},
+    "1m": {"products": 1_000_000, "customers": 50_000, "orders": 1_000_000, "categories": 500},
+}
+LINES_PER_ORDER = (1, 5)
+PAID_SHARE = 0.8
+HISTORY_DAYS = 365
+SEED_BATCH = 5000
+WORDS = ["oil", "air", "fuel", "filter", "belt", "gear", "pump", "seal", "bearing", "clutch", "brake", "hose"]
+BENCH_USER = "benchmark"
+
+
+@contextmanager
+def scratch_database(path, keep=True, **options):
+    """
+    Point the default connection at the SQLite file ``path`` (migrated on
+    entry, created if missing) for the duration of the block. ``options``
+    are merged into the connection's OPTIONS.
+    """
+    if connection.vendor != "sqlite":
+        raise RuntimeError("The benchmark database is a SQLite file.")
+    connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+    connection.settings_dict.setdefault("OPTIONS", {}).update(options)
+    original_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(original_name, verbosity=0, keepdb=keep)
+
+
+# ---------- Seeding ----------
+def _chunks(iterable, size=SEED_BATCH):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed(scale, seed_value=0, progress=None):
+    """
+    Fill an empty database with a synthetic dataset of ``scale``; returns row
+    counts. Rows go in with bulk_create, so rollups are rebuilt at the end
+    instead of being maintained by the signals.
+    """
+    sizes = SCALES[scale]
+    rng = random.Random(seed_value)
+    now = timezone.now()
+    report = progress or (lambda message: None)
+
+    with transaction.atomic():
+        categories = Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(sizes["categories"]))
+        category_ids = [c.pk for c in categories]
+        for chunk in _chunks(
+            Product(
+                category_id=rng.choice(category_ids),
+                name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                sku=f"SKU-{i:07d}",
+                description=f"{rng.choice(WORDS)} part for model {i % 97}",
+                price=Decimal(rng.randint(100, 500_000)) / 100,
+                quantity=10 ** 6,
+                minimum_stock=rng.randint(0, 20),
+            )
+            for i in range(sizes["products"])
+        ):
+            Product.objects.bulk_create(chunk)
+            ledger.record({product.pk: product.quantity for product in chunk}, notes="Opening stock")
+        report(f"{sizes['products']} products")
+        product_rows = list(Product.objects.values_list("pk", "price"))
+
+        customers = [
+            c.pk for c in Customer.objects.bulk_create(
+                (Customer(name=f"Customer {i}", phone=f"0300{i:07d}") for i in range(sizes["customers"])),
+                batch_size=SEED_BATCH,
+            )
+        ]
+
+        counters = {}
+        for chunk in _chunks(range(sizes["orders"])):
+            orders, lines = [], []
+            for _ in chunk:
+                date = now - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400))
+                day = invoice_day(date)
+                counters[day] = counters.get(day, 0) + 1
+                items = []
+                for product_id, price in rng.sample(product_rows, rng.randint(*LINES_PER_ORDER)):
+                    qty = rng.randint(1, 4)
+                    items.append(OrderItem(product_id=product_id, unit_price=price, quantity=qty,
+                                           line_total=price * qty))
+                subtotal = sum(item.line_total for item in items)
+                order = Order(
+                    customer_id=rng.choice(customers), date=date, subtotal=subtotal, total=subtotal,
+                    balance=subtotal, invoice_number=format_number(day, counters[day]),
+                )
+                if rng.random() < PAID_SHARE:
+                    order.amount_paid, order.balance, order.payment_status = subtotal, Decimal("0.00"), "paid"
+                orders.append(order)
+                lines.append(items)
+            Order.objects.bulk_create(orders)
+            items, payments = [], []
+            for order, order_items in zip(orders, lines):
+                for item in order_items:
+                    item.order_id = order.pk
+                    items.append(item)
+                if order.amount_paid:
+                    payments.append(Payment(order_id=order.pk, amount=order.amount_paid,
+                                            method=rng.choice(Payment.METHOD_CHOICES)[0],
+                                            reference=f"TXN{order.pk:09d}"))
+            OrderItem.objects.bulk_create(items)
+            Payment.objects.bulk_create(payments)
+        InvoiceSequence.objects.bulk_create(InvoiceSequence(day=day, last_value=v) for day, v in counters.items())
+        # Payment.date is auto_now_add; move payments to their order's date
+        Payment.objects.update(date=Subquery(Order.objects.filter(pk=OuterRef("order_id")).values("date")[:1]))
+        report(f"{sizes['orders']} orders")
+
+        rollups.rebuild()
+        report("rollups rebuilt")
+
+    User = get_user_model()
+    if not User.objects.filter(username=BENCH_USER).exists():
+        User.objects.create_superuser(BENCH_USER, password=None)
+    return {
+        "products": sizes["products"], "customers": sizes["customers"], "orders": sizes["orders"],
+        "order_items": OrderItem.objects.count(), "payments": Payment.objects.count(),
+    }
+
+
+# ---------- Scenarios ----------
+class Scenario:
+    """
+    One request shape. ``build(rng)`` returns ``(method, path, data)``; it runs
+    before the timer starts, so picking random rows is not measured.
+    """
+
+    def __init__(self, name, build, rounds=None, admin=False):
+        self.name = name
+        self.build = build
+        self.rounds = rounds
+        self.admin = admin
+
+
+def _random_pk(model, rng):
+    bounds = model.objects.order_by("pk").values_list("pk", flat=True)
+    low, high = bounds.first(), bounds.last()
+    return model.objects.filter(pk__gte=rng.randint(low, high)).order_by("pk").values_list("pk", flat=True).first()
+
+
+def _days_ago(days):
+    return (timezone.localdate() - timedelta(days=days)).isoformat()
+
+
+def _get(name, *args, **params):
+    return lambda rng: ("get", reverse(name, args=args), params)
+
+
+def _order(name, **data):
+    return lambda rng: ("post" if data else "get", reverse(name, args=[_random_pk(Order, rng)]), data)
+
+
+def _new_order(rng):
+    return ("post", reverse("billing:order_create"), {
+        "customer": _random_pk(Customer, rng),
+        f"product_{_random_pk(Product, rng)}": rng.randint(1, 3),
+    })
+
+
+def _scan(rng):
+    sku = Product.objects.filter(pk=_random_pk(Product, rng)).values_list("sku", flat=True).first()
+    return ("get", reverse("inventory:product-scan"), {"code": sku or ""})
+
+
+def _admin_search(name, field):
+    def build(rng):
+        model = Order if field == "invoice_number" else Payment
+        value = model.objects.filter(pk=_random_pk(model, rng)).values_list(field, flat=True).first() or ""
+        return ("get", reverse(name), {"q": value[:-2]})
+
+    return build
+
+
+def _admin_bulk_edit(rng):
+    """The product changelist's first page posted back with a new price on every row."""
+    page = list(Product.objects.order_by("name", "-pk").values_list("pk", "quantity", "minimum_stock")[:100])
+    data = {"_save": "Save", "form-TOTAL_FORMS": len(page), "form-INITIAL_FORMS": len(page)}
+    for index, (pk, quantity, minimum_stock) in enumerate(page):
+        data.update({
+            f"form-{index}-id": pk, f"form-{index}-quantity": quantity + rng.randint(0, 1),
+            f"form-{index}-minimum_stock": minimum_stock, f"form-{index}-price": f"{rng.randint(100, 99999) / 100:.2f}",
+        })
+    return ("post", reverse("admin:inventory_product_changelist"), data)
+
+
+SCENARIOS = [
+    Scenario("product_list", _get("inventory:product-list")),
+    Scenario("product_list_search", lambda rng: ("get", reverse("inventory:product-list"), {"q": rng.choice(WORDS)})),
+    Scenario("product_search_json", lambda rng: (
+        "get", reverse("inventory:product-search"), {"q": rng.choice(WORDS)[:3]})),
+    Scenario("product_scan", _scan),
+    Scenario("order_create_form", _get("billing:order_create")),
+    Scenario("order_create", _new_order),
+    Scenario("product_picker", lambda rng: ("get", reverse("billing:product_lookup"), {"q": rng.choice(WORDS)[:3]})),
+    Scenario("customer_picker", lambda rng: (
+        "get", reverse("billing:customer_lookup"), {"q": f"Customer {rng.randint(1, 99)}"})),
+    Scenario("order_list", _get("billing:order_list")),
+    Scenario("order_detail", _order("billing:order_detail")),
+    Scenario("add_payment", _order("billing:add_payment", amount="1.00", method="cash")),
+    Scenario("invoice_view", _order("billing:invoice_view")),
+    Scenario("report_revenue", lambda rng: ("get", reverse("billing:report_revenue"), {"from": _days_ago(365)})),
+    Scenario("report_top_products", lambda rng: (
+        "get", reverse("billing:report_top_products"), {"from": _days_ago(90)})),
+    Scenario("ar_aging", _get("billing:ar_aging")),
+    Scenario("customer_statement", lambda rng: (
+        "get", reverse("billing:customer_statement", args=[_random_pk(Customer, rng)]), {})),
+    Scenario("admin_products", _get("admin:inventory_product_changelist"), admin=True),
+    Scenario("admin_orders", _get("admin:billing_order_changelist"), admin=True),
+    Scenario("admin_payments", _get("admin:billing_payment_changelist"), admin=True),
+    Scenario("admin_orders_search", _admin_search("admin:billing_order_changelist", "invoice_number"), admin=True),
+    Scenario("admin_payments_search", _admin_search("admin:billing_payment_changelist", "reference"), admin=True),
+    Scenario("admin_order_change", lambda rng: (
+        "get", reverse("admin:billing_order_change", args=[_random_pk(Order, rng)]), {}), admin=True),
+    Scenario("admin_products_bulk_edit", _admin_bulk_edit, rounds=10, admin=True),
+    Scenario("admin_customers", _get("admin:billing_customer_changelist"), admin=True),
+    Scenario("admin_stock_ledger", _get("admin:inventory_stocktransaction_changelist"), admin=True),
+    Scenario("export_orders_week_csv", lambda rng: (
+        "get", reverse("billing:order_export"), {"from": _days_ago(7)}), rounds=5),
+    Scenario("export_products_csv", _get("inventory:product-export"), rounds=3),
+    Scenario("export_ar_aging_csv", _get("billing:ar_aging_export"), rounds=3),
+]
+
+
+def _consume(response):
+    if response.streaming:
+        for _chunk in response.streaming_content:
+            pass
+    return response
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    return {
+        "rounds": len(timings),
+        "min_ms": round(timings[0], 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "max_ms": round(timings[-1], 2),
+        "stddev_ms": round(statistics.pstdev(timings), 2),
+        "queries": max(queries),
+    }
+
+
+def run(rounds=20, warmup=2, only=None, seed_value=0, progress=None):
+    """
+    Time every scenario (or those named in ``only``) and return the baseline
+    dict. Each round's wall time covers the whole request, including a
+    streamed body.
+    """
+    rng = random.Random(seed_value)
+    client = Client()
+    admin = Client()
+    admin.force_login(get_user_model().objects.get(username=BENCH_USER))
+    results = {}
+    hosts = override_settings(ALLOWED_HOSTS=["testserver"])
+    profiling_logger = logging.getLogger("inventory.profiling")
+    level = profiling_logger.level
+    profiling_logger.setLevel(logging.ERROR)  # every 1M-row request would be logged as slow
+    try:
+        hosts.enable()
+        for scenario in SCENARIOS:
+            if only and scenario.name not in only:
+                continue
+            http = admin if scenario.admin else client
+            count = scenario.rounds or rounds
+            timings, queries = [], []
+            for index in range(warmup + count):
+                method, path, data = scenario.build(rng)
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = _consume(getattr(http, method)(path, data))
+                    elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{scenario.name}: HTTP {response.status_code}")
+                if index >= warmup:
+                    timings.append(elapsed)
+                    queries.append(len(ctx.captured_queries))
+            results[scenario.name] = summarize(timings, queries)
+            if progress:
+                progress(scenario.name, results[scenario.name])
+    finally:
+        hosts.disable()
+        profiling_logger.setLevel(level)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": connection.Database.sqlite_version,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "created": timezone.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(baseline, current, threshold=0.2, metric="median_ms"):
+    """
+    ``[(scenario, before, after, change, regressed), ...]`` for scenarios in
+    both baselines; a scenario regresses when ``metric`` grows by more than
+    ``threshold`` or it issues more queries than before.
+    """
+    rows = []
+    for name, after in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+        regressed = change > threshold or after["queries"] > before["queries"]
+        rows.append((name, before, after, change, regressed))
+    return rows
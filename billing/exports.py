@@ -0,0 +1,45 @@
+"""Accounting exports for billing, streamed through inventory.exports."""
+from inventory.exports import FORMATS, Export, admin_actions, respond, response  # noqa: F401
+
+from .models import Customer, Order, Payment
+
+# one row per order line; orders without lines still get one row (LEFT JOIN)
+ORDERS = Export("orders", Order.objects, [
+    ("Order ID", "pk"),
+    ("Invoice", "invoice_number"),
+    ("Date", "date"),
+    ("Customer ID", "customer_id"),
+    ("Customer", "customer__name"),
+    ("Subtotal", "subtotal"),
+    ("Tax", "tax"),
+    ("Discount", "discount"),
+    ("Total", "total"),
+    ("Paid", "amount_paid"),
+    ("Balance", "balance"),
+    ("Status", "payment_status"),
+    ("Product ID", "items__product_id"),
+    ("Product", "items__product__name"),
+    ("Unit price", "items__unit_price"),
+    ("Quantity", "items__quantity"),
+    ("Line total", "items__line_total"),
+], ordering=("date", "pk", "items__id"), date_field="date")
+
+CUSTOMERS = Export("customers", Customer.objects, [
+    ("ID", "pk"),
+    ("Name", "name"),
+    ("Phone", "phone"),
+    ("Email", "email"),
+    ("Address", "address"),
+    ("Created", "created_at"),
+])
+
+PAYMENTS = Export("payments", Payment.objects, [
+    ("ID", "pk"),
+    ("Date", "date"),
+    ("Order ID", "order_id"),
+    ("Invoice", "order__invoice_number"),
+    ("Customer", "order__customer__name"),
+    ("Method", "method"),
+    ("Amount", "amount"),
+    ("Reference", "reference"),
+], ordering=("date", "pk"), date_field="date")
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+
+TEMPLATE_NAME = "billing/invoice_template.html"
+# Bump when invoice_template.html changes so cached PDFs are re-rendered.
+TEMPLATE_VERSION = 2
+
+LOGO_PATH = "/static/images/tractor_logo.png"
+COMPANY = {
+    "company_name": "Ittefaq Auto Tractor Spare Parts",
+    "company_address": "Main Market, Lahore, Pakistan",
+    "company_phone": "+92 300 1234567",
+    "company_email": "info@ittefaqtractors.com",
+}
+
+
+def company_context(request=None, base_url=None):
+    if request is not None:
+        logo_url = request.build_absolute_uri(LOGO_PATH)
+    else:
+        logo_url = (base_url or "").rstrip("/") + LOGO_PATH
+    return {**COMPANY, "logo_url": logo_url}
+
+
+def invoice_queryset(queryset=None):
+    """Orders with everything the invoice template touches loaded up front."""
+    from .models import Order
+
+    queryset = Order.objects.all() if queryset is None else queryset
+    return queryset.select_related("customer").prefetch_related("items__product", "payments")
+
+
+class Invoice:
+    """
+    Everything invoice_template.html renders, loaded once through
+    invoice_queryset() and shared by the HTML view, the PDF view and batch
+    rendering. Instances pickle cleanly for worker processes.
+    """
+
+    def __init__(self, order):
+        self.order = order
+        self.customer = order.customer
+        self.items = list(order.items.all())
+        self.payments = list(order.payments.all())
+
+    def context(self, company):
+        return {"order": self.order, "customer": self.customer, "items": self.items, **company}
+
+    @property
+    def digest(self):
+        return fingerprint(self)
+
+
+def load_invoice(pk):
+    return Invoice(get_object_or_404(invoice_queryset(), pk=pk))
+
+
+def fingerprint(invoice):
+    """
+    Content hash of everything the invoice shows: order totals, customer,
+    items (with current product names), payments and the company block.
+    """
+    order, customer = invoice.order, invoice.customer
+    items = [
+        (item.product_id, item.product.name, item.unit_price, item.quantity, item.line_total)
+        for item in invoice.items
+    ]
+    payments = sorted((p.pk, p.amount, p.method, p.date) for p in invoice.payments)
+    payload = [
+        TEMPLATE_VERSION,
+        sorted(COMPANY.items()),
+        [order.invoice_number, order.date, order.subtotal, order.tax, order.discount, order.total,
+         order.amount_paid, order.payment_status],
+        [customer.name, customer.phone, customer.email],
+        items,
+        payments,
+    ]
+    return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()[:32]
+
+
+def cache_dir(order_id):
+    return os.path.join(settings.INVOICE_STORAGE_PATH, str(order_id))
+
+
+def cached_path(order_id, digest):
+    return os.path.join(cache_dir(order_id), f"{digest}.pdf")
+
+
+def store(order_id, digest, pdf):
+    """Atomically write ``pdf`` for this digest and drop older versions of the order's invoice."""
+    directory = cache_dir(order_id)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(pdf)
+    path = cached_path(order_id, digest)
+    os.replace(tmp, path)
+    for name in os.listdir(directory):
+        if name != os.path.basename(path) and name.endswith(".pdf"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+def purge(order_id):
+    shutil.rmtree(cache_dir(order_id), ignore_errors=True)
+
+
+def render_pdf(context):
+    from weasyprint import HTML
+
+    html_string = render_to_string(TEMPLATE_NAME, context)
+    base_url = str(settings.BASE_DIR)  # FIX for WindowsPath
+    return HTML(string=html_string, base_url=base_url).write_pdf()
+
+
+def cache_entries():
+    """Yield (path, size, mtime) for every cached invoice PDF."""
+    root = settings.INVOICE_STORAGE_PATH
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(".pdf"):
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+
+# ---------- Batch rendering ----------
+BATCH_CHUNK_SIZE = 200
+
+
+def _init_worker():
+    # spawn-based platforms (Windows, macOS) start workers without Django loaded
+    import django
+
+    django.setup()
+
+
+def _render_job(job):
+    order_id, digest, context = job
+    return order_id, store(order_id, digest, render_pdf(context))
+
+
+def render_batch(queryset, workers=None, base_url=None, force=False, chunk_size=BATCH_CHUNK_SIZE, on_result=None):
+    """
+    Render invoices for every order in ``queryset`` across a process pool.
+
+    Orders are loaded ``chunk_size`` at a time through invoice_queryset(), so
+    workers get fully prefetched, picklable orders and never touch the
+    database. Invoices already cached for the current content hash are
+    skipped unless ``force`` is set. Returns
+    ``{"rendered": [(order_id, path), ...], "skipped": [...], "failed": [(order_id, error), ...],
+    "seconds": float}``.
+    """
+    company = company_context(base_url=base_url)
+    result = {"rendered": [], "skipped": [], "failed": [], "seconds": 0.0}
+    started = time.perf_counter()
+
+    def jobs():
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(pks), chunk_size):
+            for order in invoice_queryset().filter(pk__in=pks[start:start + chunk_size]):
+                invoice = Invoice(order)
+                digest = invoice.digest
+                path = cached_path(order.pk, digest)
+                if not force and os.path.exists(path):
+                    result["skipped"].append((order.pk, path))
+                    continue
+                yield order.pk, digest, invoice.context(company)
+
+    def collect(order_id, outcome, error=None):
+        if error is None:
+            result["rendered"].append(outcome)
+        else:
+            result["failed"].append((order_id, error))
+        if on_result:
+            on_result(order_id, error)
+
+    if not workers:
+        for job in jobs():
+            try:
+                collect(job[0], _render_job(job))
+            except Exception as exc:
+                collect(job[0], None, exc)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = {}
+
+            def drain(return_when):
+                done, _ = wait(pending, return_when=return_when)
+                for future in done:
+                    order_id = pending.pop(future)
+                    try:
+                        collect(order_id, future.result())
+                    except Exception as exc:
+                        collect(order_id, None, exc)
+
+            for job in jobs():
+                # bound in-flight jobs so memory does not grow with the batch size
+                if len(pending) >= workers * 4:
+                    drain(FIRST_COMPLETED)
+                pending[pool.submit(_render_job, job)] = job[0]
+            if pending:
+                drain(ALL_COMPLETED)
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def write_zip(paths, zip_path):
+    """Bundle ``[(arcname, path), ...]`` into ``zip_path``; PDFs are already compressed."""
+    os.makedirs(os.path.dirname(zip_path) or ".", exist_ok=True)
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in paths:
+            archive.write(path, arcname)
+    return zip_path
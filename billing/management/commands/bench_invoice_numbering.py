@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from billing.models import Customer, Order
+from billing.numbering import BlockAllocator
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare order inserts per second for the old insert-then-UPDATE invoice numbering, "
+        "the per-day sequence and block pre-allocation, on a throwaway SQLite database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=2000, help="Orders inserted per scheme.")
+        parser.add_argument("--block-size", type=int, default=100)
+        parser.add_argument("--path", help="SQLite file to use (default: a temporary file).")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark targets SQLite.")
+
+        path = opts["path"] or os.path.join(tempfile.mkdtemp(), "numbering.sqlite3")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+        original_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            customer = Customer.objects.create(name="Bench customer")
+            allocator = BlockAllocator(opts["block_size"])
+            schemes = [
+                ("insert + UPDATE", lambda: self._legacy(customer)),
+                ("sequence", lambda: self._sequence(customer)),
+                (f"block of {opts['block_size']}", lambda: self._block(customer, allocator)),
+            ]
+            self.stdout.write(f"{'scheme':>16} {'orders/s':>10} {'ms/order':>10}")
+            for label, insert in schemes:
+                started = time.perf_counter()
+                for _ in range(opts["orders"]):
+                    insert()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:>16} {opts['orders'] / elapsed:>10.1f} {elapsed * 1000 / opts['orders']:>10.3f}"
+                )
+        finally:
+            connection.creation.destroy_test_db(original_name, verbosity=0)
+
+    # Each scheme commits one transaction per order, as a checkout would.
+    @transaction.atomic
+    def _legacy(self, customer):
+        # the previous Order.save(): insert, then number from the id in a second
+        # statement (prefixed so it cannot collide with the sequence schemes)
+        order = Order.objects.create(customer=customer, invoice_number=uuid.uuid4().hex)
+        Order.objects.filter(pk=order.pk).update(invoice_number=f"OLD-{order.date:%Y%m%d}-{order.pk:05d}")
+
+    @transaction.atomic
+    def _sequence(self, customer):
+        Order.objects.create(customer=customer)
+
+    def _block(self, customer, allocator):
+        number = allocator.take(timezone.now())
+        with transaction.atomic():
+            Order.objects.create(customer=customer, invoice_number=number)
@@ -0,0 +1,45 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Category, Product
+from billing.models import Customer
+from billing.services import create_order
+
+
+class Command(BaseCommand):
+    help = "Benchmark billing.services.create_order: query count and latency per number of order lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50, 200])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        sizes = opts["lines"]
+        repeat = opts["repeat"]
+
+        # Everything runs inside one transaction that is rolled back at the end,
+        # so the benchmark never leaves synthetic rows in the database.
+        with transaction.atomic():
+            category = Category.objects.create(name="__bench_order_create__")
+            products = Product.objects.bulk_create(
+                Product(category=category, name=f"Bench {i}", price=Decimal("9.99"), quantity=10 ** 6)
+                for i in range(max(sizes))
+            )
+            customer = Customer.objects.create(name="Bench customer")
+
+            self.stdout.write(f"{'lines':>6} {'queries':>8} {'ms/order':>10}")
+            for size in sizes:
+                lines = {p.pk: 1 for p in products[:size]}
+                with CaptureQueriesContext(connection) as ctx:
+                    create_order(customer, lines)
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    create_order(customer, lines)
+                elapsed = (time.perf_counter() - started) * 1000 / repeat
+                self.stdout.write(f"{size:>6} {len(ctx.captured_queries):>8} {elapsed:>10.2f}")
+
+            transaction.set_rollback(True)
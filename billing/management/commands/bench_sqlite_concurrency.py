@@ -0,0 +1,134 @@
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from billing import benchmarks
+from billing.models import Customer
+from inventory import db
+from inventory.models import Product
+
+# Django's out-of-the-box SQLite setup: rollback journal, FULL sync, a new
+# connection per request and DEFERRED transactions
+STOCK = {
+    "pragmas": {**{name: None for name in db.PRAGMAS}, "journal_mode": "delete", "synchronous": "full"},
+    "conn_max_age": 0,
+    "transaction_mode": "DEFERRED",
+}
+TUNED = {"pragmas": {}, "conn_max_age": 600, "transaction_mode": "IMMEDIATE"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mixed read/write throughput on a seeded SQLite file: order_list readers and order_create "
+        "writers in parallel threads, first with Django's stock SQLite settings, then with the "
+        "inventory.db pragmas, persistent connections and IMMEDIATE transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(benchmarks.SCALES), default="10k")
+        parser.add_argument("--path", help="SQLite file (default: benchmark-concurrency-<scale>.sqlite3 here).")
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run.")
+
+    def handle(self, *args, **opts):
+        path = os.path.abspath(opts["path"] or f"benchmark-concurrency-{opts['scale']}.sqlite3")
+        with benchmarks.scratch_database(path):
+            if not Product.objects.exists():
+                self.stdout.write(f"Seeding {opts['scale']} into {path} ...")
+                benchmarks.seed(opts["scale"])
+            self.customers = list(Customer.objects.values_list("pk", flat=True)[:1000])
+            self.products = list(Product.objects.values_list("pk", flat=True)[:5000])
+
+            self.stdout.write(
+                f"{opts['readers']} order_list readers, {opts['writers']} order_create writers, "
+                f"{opts['seconds']:.0f}s per run"
+            )
+            self.stdout.write(
+                f"{'config':<8} {'reads/s':>9} {'writes/s':>9} {'read p95':>9} {'write p95':>10} {'errors':>7}"
+            )
+            results = {}
+            for label, config in (("stock", STOCK), ("tuned", TUNED)):
+                results[label] = self._run(config, opts)
+                r = results[label]
+                self.stdout.write(
+                    f"{label:<8} {r['reads']:>9.1f} {r['writes']:>9.1f} {r['read_p95']:>8.1f}ms "
+                    f"{r['write_p95']:>8.1f}ms {r['errors']:>7}"
+                )
+        stock, tuned = results["stock"], results["tuned"]
+        self.stdout.write(
+            f"tuned/stock: reads x{tuned['reads'] / max(stock['reads'], 1e-9):.2f}, "
+            f"writes x{tuned['writes'] / max(stock['writes'], 1e-9):.2f}"
+        )
+
+    def _run(self, config, opts):
+        # the thread connections are built from this shared settings dict
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = config["conn_max_age"]
+        connection.settings_dict["OPTIONS"]["transaction_mode"] = config["transaction_mode"]
+        latencies = {"read": [], "write": []}
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + opts["seconds"]
+        list_url, create_url = reverse("billing:order_list"), reverse("billing:order_create")
+
+        def worker(kind, seed_value):
+            rng = random.Random(seed_value)
+            client = Client()
+            mine, failed = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    if kind == "read":
+                        request = lambda: client.get(list_url)
+                    else:
+                        data = {"customer": rng.choice(self.customers), f"product_{rng.choice(self.products)}": 1}
+                        request = lambda: client.post(create_url, data)
+                    started = time.perf_counter()
+                    try:
+                        response = request()
+                        ok = response.status_code < 400
+                    except OperationalError:
+                        ok = False
+                    if ok:
+                        mine.append((time.perf_counter() - started) * 1000)
+                    else:
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                latencies[kind].extend(mine)
+                errors.append(failed)
+
+        logging.getLogger("inventory.profiling").setLevel(logging.ERROR)
+        with override_settings(SQLITE_PRAGMAS=config["pragmas"], ALLOWED_HOSTS=["testserver"]):
+            # journal_mode is stored in the file: let the connection hook switch it
+            # before the workers connect
+            connection.ensure_connection()
+            connection.close()
+            threads = [
+                threading.Thread(target=worker, args=(kind, index))
+                for index, kind in enumerate(["read"] * opts["readers"] + ["write"] * opts["writers"])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        def p95(samples):
+            return statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else float(sum(samples))
+
+        return {
+            "reads": len(latencies["read"]) / opts["seconds"],
+            "writes": len(latencies["write"]) / opts["seconds"],
+            "read_p95": p95(latencies["read"]),
+            "write_p95": p95(latencies["write"]),
+            "errors": sum(errors),
+        }
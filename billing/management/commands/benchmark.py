@@ -0,0 +1,89 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing import benchmarks
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a benchmark database at a fixed scale and time the inventory and billing hot paths "
+        "through the test client. Writes latency percentiles and query counts as a JSON baseline "
+        "and optionally compares them with an earlier one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(benchmarks.SCALES), default="10k")
+        parser.add_argument(
+            "--path", help="SQLite file holding the seeded data (default: benchmark-<scale>.sqlite3 here). "
+            "It is kept between runs so a scale is seeded once.",
+        )
+        parser.add_argument("--reseed", action="store_true", help="Recreate and reseed the database.")
+        parser.add_argument("--rounds", type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per scenario.")
+        parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="Run only these scenarios.")
+        parser.add_argument("--output", help="Write the baseline JSON here.")
+        parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier baseline JSON.")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Relative median slowdown counted as a regression (default 0.2 = 20%%).",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero on a regression.")
+
+    def handle(self, *args, **opts):
+        names = {scenario.name for scenario in benchmarks.SCENARIOS}
+        unknown = set(opts["only"] or ()) - names
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(names))}.")
+        baseline = None
+        if opts["compare"]:
+            with open(opts["compare"]) as fh:
+                baseline = json.load(fh)
+            if baseline.get("scale") != opts["scale"]:
+                self.stderr.write(f"Baseline was taken at scale {baseline.get('scale')}, this run is {opts['scale']}.")
+
+        path = os.path.abspath(opts["path"] or f"benchmark-{opts['scale']}.sqlite3")
+        with benchmarks.scratch_database(path, keep=not opts["reseed"]):
+            if not Product.objects.exists():
+                self.stdout.write(f"Seeding {opts['scale']} into {path} ...")
+                counts = benchmarks.seed(opts["scale"], progress=lambda message: self.stdout.write(f"  {message}"))
+                self.stdout.write("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+            self.stdout.write(
+                f"{'scenario':<24} {'median':>9} {'p95':>9} {'p99':>9} {'max':>9} {'queries':>8}"
+            )
+            results = benchmarks.run(
+                rounds=opts["rounds"], warmup=opts["warmup"], only=opts["only"],
+                progress=lambda name, row: self.stdout.write(
+                    f"{name:<24} {row['median_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+                    f"{row['max_ms']:>9.1f} {row['queries']:>8}"
+                ),
+            )
+            current = {"scale": opts["scale"], "environment": benchmarks.environment(), "benchmarks": results}
+
+        if opts["output"]:
+            with open(opts["output"], "w") as fh:
+                json.dump(current, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {opts['output']}")
+
+        if baseline:
+            self._report(baseline, current, opts)
+
+    def _report(self, baseline, current, opts):
+        commit = baseline.get("environment", {}).get("commit") or "baseline"
+        self.stdout.write(f"\nMedian ms vs {commit}:")
+        regressions = []
+        for name, before, after, change, regressed in benchmarks.compare(baseline, current, opts["threshold"]):
+            line = (
+                f"{name:<24} {before['median_ms']:>9.1f} -> {after['median_ms']:>9.1f} {change:>+8.1%}"
+                f"   queries {before['queries']} -> {after['queries']}"
+            )
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if regressions and opts["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} scenario(s) regressed: {', '.join(regressions)}")
@@ -0,0 +1,115 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+
+from billing.models import Customer, OrderItem
+from billing.services import InsufficientStock, OrderError, place_order
+from inventory.models import Category, Product, StockTransaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent checkout load test on a throwaway file-backed SQLite database in WAL mode. "
+        "Verifies that stock is never oversold and reports orders per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=50, help="Checkout attempts per thread.")
+        parser.add_argument("--products", type=int, default=5, help="Number of contended SKUs.")
+        parser.add_argument("--stock", type=int, default=1000, help="Starting quantity per SKU.")
+        parser.add_argument(
+            "--transaction-mode", choices=["DEFERRED", "IMMEDIATE"], default="IMMEDIATE",
+            help="SQLite BEGIN mode. DEFERRED exercises the lock-upgrade retries in place_order().",
+        )
+        parser.add_argument("--path", help="SQLite file to use (default: a temporary file).")
+        parser.add_argument("--keep", action="store_true", help="Keep the database file afterwards.")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("The load test targets SQLite.")
+
+        path = opts["path"] or os.path.join(tempfile.mkdtemp(), "loadtest.sqlite3")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+        connection.settings_dict.setdefault("OPTIONS", {})["timeout"] = 5
+        connection.settings_dict["OPTIONS"]["transaction_mode"] = opts["transaction_mode"]
+        original_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            self._run(opts)
+        finally:
+            connection.creation.destroy_test_db(original_name, verbosity=0, keepdb=opts["keep"])
+
+    def _run(self, opts):
+        category = Category.objects.create(name="Load test")
+        products = Product.objects.bulk_create(
+            Product(category=category, name=f"SKU {i}", price=Decimal("1.00"), quantity=opts["stock"])
+            for i in range(opts["products"])
+        )
+        product_ids = [p.pk for p in products]
+        customer = Customer.objects.create(name="Load test")
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(opts["orders"]):
+                    chosen = rng.sample(product_ids, k=rng.randint(1, min(3, len(product_ids))))
+                    lines = {pk: rng.randint(1, 3) for pk in chosen}
+                    try:
+                        place_order(customer, lines)
+                        outcome = "placed"
+                    except InsufficientStock:
+                        outcome = "out_of_stock"
+                    except OrderError:
+                        outcome = "busy"
+                    except Exception as exc:  # any other error is reported, not swallowed
+                        outcome = f"error: {exc.__class__.__name__}: {exc}"
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(opts["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        sold = dict(
+            OrderItem.objects.values("product").annotate(n=Sum("quantity")).values_list("product", "n")
+        )
+        logged = dict(
+            StockTransaction.objects.filter(transaction_type="OUT")
+            .values("product").annotate(n=Sum("quantity")).values_list("product", "n")
+        )
+        oversold = []
+        for product in Product.objects.filter(pk__in=product_ids):
+            expected = opts["stock"] - sold.get(product.pk, 0)
+            if product.quantity != expected or expected < 0 or logged.get(product.pk, 0) != sold.get(product.pk, 0):
+                oversold.append(
+                    f"{product.name}: stock {product.quantity}, expected {expected}, "
+                    f"sold {sold.get(product.pk, 0)}, ledger {logged.get(product.pk, 0)}"
+                )
+
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f"{outcome:>14}: {count}")
+        self.stdout.write(
+            f"{opts['threads']} threads, {elapsed:.2f}s, {outcomes['placed'] / elapsed:.1f} orders/s placed, "
+            f"{sum(outcomes.values()) / elapsed:.1f} checkouts/s attempted"
+        )
+        if oversold or any(key.startswith("error") for key in outcomes):
+            raise CommandError("Stock invariant violated:\n" + "\n".join(oversold))
+        self.stdout.write(self.style.SUCCESS("No oversell: stock, order lines and ledger agree."))
@@ -0,0 +1,48 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from billing import invoices
+
+
+class Command(BaseCommand):
+    help = "Evict cached invoice PDFs older than --max-age-days and/or beyond --max-size-mb (oldest first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-days", type=float, default=None)
+        parser.add_argument("--max-size-mb", type=float, default=None)
+
+    def handle(self, *args, **opts):
+        entries = sorted(invoices.cache_entries(), key=lambda entry: entry[2])
+        removed = freed = 0
+
+        def evict(path, size):
+            nonlocal removed, freed
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            removed += 1
+            freed += size
+
+        if opts["max_age_days"] is not None:
+            cutoff = time.time() - opts["max_age_days"] * 86400
+            keep = []
+            for path, size, mtime in entries:
+                if mtime < cutoff:
+                    evict(path, size)
+                else:
+                    keep.append((path, size, mtime))
+            entries = keep
+
+        if opts["max_size_mb"] is not None:
+            budget = opts["max_size_mb"] * 1024 * 1024
+            total = sum(size for _path, size, _mtime in entries)
+            for path, size, _mtime in entries:
+                if total <= budget:
+                    break
+                evict(path, size)
+                total -= size
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} cached invoice(s), freed {freed / 1024 / 1024:.1f} MB."))
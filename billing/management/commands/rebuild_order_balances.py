@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.services import rebuild_payment_totals, stale_payment_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute Order.amount_paid / balance / payment_status from payments, or check them with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report orders whose stored totals are stale.")
+
+    def handle(self, *args, **opts):
+        if opts["check"]:
+            stale = stale_payment_totals().values_list("pk", "invoice_number", "amount_paid", "actual_paid")
+            count = 0
+            for pk, invoice, stored, actual in stale.iterator():
+                count += 1
+                self.stdout.write(f"{invoice or pk}: stored {stored}, payments {actual}")
+            if count:
+                raise CommandError(f"{count} order(s) have stale payment totals.")
+            self.stdout.write(self.style.SUCCESS("All order payment totals are up to date."))
+            return
+
+        updated = rebuild_payment_totals()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt payment totals for {updated} order(s)."))
@@ -0,0 +1,31 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales, product and payment rollups from orders and payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="First day to rebuild (YYYY-MM-DD), inclusive.")
+        parser.add_argument("--to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD), inclusive.")
+
+    def _day(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+
+    def handle(self, *args, **opts):
+        start, end = self._day(opts["date_from"]), self._day(opts["date_to"])
+        started = time.perf_counter()
+        written = rollups.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['sales']} day(s), {written['products']} product-day(s) and "
+            f"{written['payments']} payment-method-day(s) in {time.perf_counter() - started:.1f}s."
+        ))
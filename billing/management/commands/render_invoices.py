@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from billing import invoices
+from billing.models import Order
+
+
+class Command(BaseCommand):
+    help = "Render invoice PDFs for a date range or selected orders in parallel into INVOICE_STORAGE_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="First order date (YYYY-MM-DD), inclusive.")
+        parser.add_argument("--to", dest="date_to", help="Last order date (YYYY-MM-DD), inclusive.")
+        parser.add_argument("--ids", type=int, nargs="+", help="Explicit order ids.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Worker processes; 0 renders in this process.")
+        parser.add_argument("--base-url", default=getattr(settings, "INVOICE_BASE_URL", ""),
+                            help="Site URL used for the logo in the PDF.")
+        parser.add_argument("--force", action="store_true", help="Re-render invoices that are already cached.")
+        parser.add_argument("--zip", dest="zip_path", help="Also bundle the PDFs into this zip file.")
+
+    def _day(self, value, end=False):
+        try:
+            day = datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+        return timezone.make_aware(datetime.combine(day, time.max if end else time.min))
+
+    def handle(self, *args, **opts):
+        orders = Order.objects.all()
+        if opts["ids"]:
+            orders = orders.filter(pk__in=opts["ids"])
+        if opts["date_from"]:
+            orders = orders.filter(date__gte=self._day(opts["date_from"]))
+        if opts["date_to"]:
+            orders = orders.filter(date__lte=self._day(opts["date_to"], end=True))
+        if not (opts["ids"] or opts["date_from"] or opts["date_to"]):
+            raise CommandError("Pass --from/--to and/or --ids.")
+
+        result = invoices.render_batch(
+            orders, workers=opts["workers"], base_url=opts["base_url"], force=opts["force"]
+        )
+        for order_id, error in result["failed"]:
+            self.stderr.write(f"Order {order_id}: {error}")
+
+        rendered = len(result["rendered"])
+        rate = rendered / result["seconds"] if result["seconds"] else 0
+        self.stdout.write(
+            f"Rendered {rendered}, skipped {len(result['skipped'])} cached, failed {len(result['failed'])} "
+            f"in {result['seconds']:.1f}s ({rate:.1f} invoices/s)."
+        )
+
+        if opts["zip_path"]:
+            numbers = dict(orders.values_list("pk", "invoice_number").iterator())
+            entries = [
+                (f"invoice_{numbers.get(order_id) or order_id}.pdf", path)
+                for order_id, path in result["rendered"] + result["skipped"]
+            ]
+            invoices.write_zip(entries, opts["zip_path"])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(entries)} invoices to {opts['zip_path']}."))
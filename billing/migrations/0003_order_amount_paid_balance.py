@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_amount_paid(apps, schema_editor):
+    Order = apps.get_model('billing', 'Order')
+    Payment = apps.get_model('billing', 'Payment')
+    paid = Payment.objects.filter(order=OuterRef('pk')).values('order').annotate(s=Sum('amount')).values('s')
+    Order.objects.update(amount_paid=Coalesce(Subquery(paid), Value(Decimal('0.00'))))
+    Order.objects.update(balance=F('total') - F('amount_paid'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_alter_customer_options_alter_order_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['balance'], name='billing_order_balance_idx'),
+        ),
+        migrations.RunPython(backfill_amount_paid, migrations.RunPython.noop),
+    ]
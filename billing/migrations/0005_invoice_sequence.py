@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:15
+
+import re
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # Old numbers used the order id as suffix; start each day's counter above
+    # the highest suffix already issued for that day so numbers never collide.
+    Order = apps.get_model('billing', 'Order')
+    InvoiceSequence = apps.get_model('billing', 'InvoiceSequence')
+    pattern = re.compile(r'^INV-(\d{8})-(\d+)$')
+    highest = {}
+    for number in Order.objects.values_list('invoice_number', flat=True).iterator():
+        match = pattern.match(number or '')
+        if match:
+            day = datetime.strptime(match.group(1), '%Y%m%d').date()
+            highest[day] = max(highest.get(day, 0), int(match.group(2)))
+    InvoiceSequence.objects.bulk_create(
+        InvoiceSequence(day=day, last_value=value) for day, value in highest.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
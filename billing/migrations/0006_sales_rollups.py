@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('billing', 'Order')
+    OrderItem = apps.get_model('billing', 'OrderItem')
+    Payment = apps.get_model('billing', 'Payment')
+    DailySales = apps.get_model('billing', 'DailySales')
+    DailyProductSales = apps.get_model('billing', 'DailyProductSales')
+    DailyPaymentTotal = apps.get_model('billing', 'DailyPaymentTotal')
+
+    orders = Order.objects.annotate(day=TruncDate('date')).values('day').order_by('day').annotate(
+        order_count=Count('pk'), subtotal=Sum('subtotal'), tax=Sum('tax'),
+        discount=Sum('discount'), total=Sum('total'),
+    )
+    DailySales.objects.bulk_create((DailySales(**row) for row in orders.iterator()), batch_size=1000)
+
+    items = OrderItem.objects.annotate(day=TruncDate('order__date')).values(
+        'day', 'product_id', 'product__category_id',
+    ).order_by('day', 'product_id').annotate(quantity=Sum('quantity'), revenue=Sum('line_total'))
+    DailyProductSales.objects.bulk_create(
+        (
+            DailyProductSales(day=row['day'], product_id=row['product_id'], category_id=row['product__category_id'],
+                              quantity=row['quantity'], revenue=row['revenue'])
+            for row in items.iterator()
+        ),
+        batch_size=1000,
+    )
+
+    payments = Payment.objects.annotate(day=TruncDate('date')).values('day', 'method').order_by(
+        'day', 'method',
+    ).annotate(payment_count=Count('pk'), amount=Sum('amount'))
+    DailyPaymentTotal.objects.bulk_create((DailyPaymentTotal(**row) for row in payments.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_invoice_sequence'),
+        ('inventory', '0006_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('tax', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'daily sales',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('bank', 'Bank Transfer'), ('online', 'Online')], max_length=20)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'ordering': ['day', 'method'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'method'), name='billing_dailypayment_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.product')),
+            ],
+            options={
+                'verbose_name_plural': 'daily product sales',
+                'ordering': ['day', 'product'],
+                'indexes': [models.Index(fields=['category', 'day'], name='billing_dailyproduct_cat_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'product'), name='billing_dailyproduct_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
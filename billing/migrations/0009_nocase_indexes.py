@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:24
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_receivables_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # these used to be created outside the migrations by a post_migrate hook
+        migrations.RunSQL(
+            [
+                "DROP INDEX IF EXISTS billing_customer_name_ci",
+                "DROP INDEX IF EXISTS billing_customer_phone_ci",
+                "DROP INDEX IF EXISTS billing_order_invoice_ci",
+                "DROP INDEX IF EXISTS billing_payment_ref_ci",
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'NOCASE'), name='billing_customer_name_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.comparison.Collate('phone', 'NOCASE'), name='billing_customer_phone_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.comparison.Collate('invoice_number', 'NOCASE'), name='billing_order_invoice_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(django.db.models.functions.comparison.Collate('reference', 'NOCASE'), name='billing_payment_ref_ci'),
+        ),
+    ]
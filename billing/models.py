@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Collate
+from django.db.models.lookups import LessThan, LessThanOrEqual
 from django.conf import settings
 from decimal import Decimal
 from django.utils import timezone
-from inventory.models import Product  # <- use existing inventory Product
+from inventory.models import Category, Product  # <- use existing inventory Product
 
 
 class Customer(models.Model):
@@ -11,14 +14,58 @@ class Customer(models.Model):
     email = models.EmailField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"], name="billing_customer_created_idx"),
+            # keyset pages of the AR aging report (billing.receivables)
+            models.Index(fields=["name"], name="billing_customer_name_idx"),
+            # SQLite only uses an index for LIKE 'abc%' when it collates NOCASE:
+            # the customer picker (billing.pickers)
+            models.Index(Collate("name", "NOCASE"), name="billing_customer_name_ci"),
+            models.Index(Collate("phone", "NOCASE"), name="billing_customer_phone_ci"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class InvoiceSequence(models.Model):
+    """Per-day invoice counter; see billing.numbering."""
+
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, day, count=1):
+        """
+        Advance ``day``'s counter by ``count`` and return the new last value,
+        in one upsert statement within the caller's transaction.
+        """
+        connection = connections[router.db_for_write(cls)]
+        if connection.vendor in ("sqlite", "postgresql"):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {cls._meta.db_table} (day, last_value) VALUES (%s, %s) "
+                    "ON CONFLICT (day) DO UPDATE SET last_value = last_value + excluded.last_value "
+                    "RETURNING last_value",
+                    [day.isoformat(), count],
+                )
+                return cursor.fetchone()[0]
+        with transaction.atomic(using=connection.alias):
+            sequence, _ = cls.objects.select_for_update().get_or_create(day=day)
+            cls.objects.filter(pk=sequence.pk).update(last_value=F("last_value") + count)
+            return sequence.last_value + count
+
+
 class Order(models.Model):
     PAYMENT_STATUS = [
         ("unpaid", "Unpaid"),
@@ -33,29 +80,67 @@ class Order(models.Model):
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
     total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    # maintained incrementally by billing.signals on Payment writes
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"), editable=False)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"), editable=False)
     invoice_number = models.CharField(max_length=50, unique=True, blank=True)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default="unpaid")
     notes = models.TextField(blank=True, null=True)
+    # version stamp for cached fragments; queryset updates set it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            # open orders: the outstanding list and the aging totals, date covered
+            models.Index(fields=["balance", "date"], name="billing_order_balance_date_idx"),
+            # "has an open order" probes per customer in the aging report
+            models.Index(fields=["customer", "balance"], name="billing_order_customer_bal_idx"),
+            models.Index(fields=["date"], name="billing_order_date_idx"),
+            # the admin's "^invoice_number" search (billing.admin)
+            models.Index(Collate("invoice_number", "NOCASE"), name="billing_order_invoice_ci"),
+        ]
 
     def __str__(self):
         return self.invoice_number or f"Order #{self.pk}"
 
-    @property
-    def amount_paid(self):
-        return self.payments.aggregate(x=models.Sum("amount"))["x"] or Decimal("0.00")
+    @staticmethod
+    def payment_status_expression(paid, total=F("total")):
+        """SQL equivalent of the status rules in refresh_totals."""
+        return Case(
+            When(LessThanOrEqual(paid, Value(0)), then=Value("unpaid")),
+            When(LessThan(paid, total), then=Value("partial")),
+            default=Value("paid"),
+        )
 
-    @property
-    def balance(self):
-        return (self.total or Decimal("0.00")) - self.amount_paid
+    @classmethod
+    def apply_payment_delta(cls, order_id, delta):
+        """Add ``delta`` to the stored amount_paid in a single UPDATE."""
+        paid = F("amount_paid") + Value(delta)
+        cls.objects.filter(pk=order_id).update(
+            amount_paid=paid,
+            balance=F("total") - paid,
+            payment_status=cls.payment_status_expression(paid),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def touch(cls, *order_ids):
+        """Bump updated_at so cached fragments of these orders are re-rendered."""
+        cls.objects.filter(pk__in=order_ids).update(updated_at=timezone.now())
+
+    @classmethod
+    def touch_for_products(cls, *product_ids):
+        """touch() every order with a line for one of these products, e.g. after a rename."""
+        cls.objects.filter(items__product_id__in=product_ids).update(updated_at=timezone.now())
 
     def refresh_totals(self):
         items_total = self.items.aggregate(x=models.Sum("line_total"))["x"] or Decimal("0.00")
         self.subtotal = items_total
         self.total = (items_total + (self.tax or 0) - (self.discount or 0)).quantize(Decimal("0.01"))
-        # payment status
+        self._set_payment_status()
+
+    def _set_payment_status(self):
         paid = self.amount_paid
         if paid <= 0:
             self.payment_status = "unpaid"
@@ -65,11 +150,25 @@ class Order(models.Model):
             self.payment_status = "paid"
 
     def save(self, *args, **kwargs):
-        creating = self.pk is None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and not self._state.adding:
+            # amount_paid is kept by F() updates from the Payment signals, so the
+            # in-memory copy may be stale; a full save writes the stored value back
+            paid = Order.objects.filter(pk=self.pk).values_list("amount_paid", flat=True).first()
+            if paid is not None and paid != self.amount_paid:
+                self.amount_paid = paid
+                self._set_payment_status()
+        self.balance = (self.total or Decimal("0.00")) - (self.amount_paid or Decimal("0.00"))
+        if update_fields:
+            extra = {"updated_at"}
+            if {"total", "amount_paid"} & set(update_fields):
+                extra.add("balance")
+            kwargs["update_fields"] = {*update_fields, *extra}
+        if self._state.adding and not self.invoice_number:
+            from .numbering import next_invoice_number
+
+            self.invoice_number = next_invoice_number(self.date)
         super().save(*args, **kwargs)
-        if creating and not self.invoice_number:
-            self.invoice_number = f"INV-{self.date.strftime('%Y%m%d')}-{self.id:05d}"
-            super().save(update_fields=["invoice_number"])
 
 
 class OrderItem(models.Model):
@@ -107,6 +206,65 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            # the admin's "^reference" search (billing.admin)
+            models.Index(Collate("reference", "NOCASE"), name="billing_payment_ref_ci"),
+        ]
 
     def __str__(self):
         return f"Payment {self.amount} for {self.order.invoice_number}"
+
+
+# ---------- Sales rollups (maintained by billing.rollups) ----------
+class DailySales(models.Model):
+    day = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        ordering = ["day"]
+        verbose_name_plural = "daily sales"
+
+    def __str__(self):
+        return f"{self.day}: {self.total}"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    # the product's current category, kept in sync by billing.rollups
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        ordering = ["day", "product"]
+        verbose_name_plural = "daily product sales"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="billing_dailyproduct_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["category", "day"], name="billing_dailyproduct_cat_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.quantity}"
+
+
+class DailyPaymentTotal(models.Model):
+    day = models.DateField()
+    method = models.CharField(max_length=20, choices=Payment.METHOD_CHOICES)
+    payment_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        ordering = ["day", "method"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "method"], name="billing_dailypayment_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.method}: {self.amount}"
@@ -0,0 +1,71 @@
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import InvoiceSequence
+
+NUMBER_RE = re.compile(r"^INV-(\d{8})-(\d+)$")
+
+
+def invoice_day(date):
+    return timezone.localtime(date).date() if timezone.is_aware(date) else date.date()
+
+
+def format_number(day, value):
+    return f"INV-{day:%Y%m%d}-{value:05d}"
+
+
+def next_invoice_number(date):
+    """
+    Gap-free: the counter moves in the same transaction as the order insert,
+    so a rolled-back order also rolls back its number.
+    """
+    day = invoice_day(date)
+    return format_number(day, InvoiceSequence.allocate(day))
+
+
+class BlockAllocator:
+    """
+    Per-process pool of invoice numbers reserved ``block_size`` at a time,
+    for high insert rates. Numbers taken for an order that then fails are
+    handed back to the pool, but numbers still pooled when the process exits
+    are lost, so this mode is not gap-free.
+    """
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._pools = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def take(self, date):
+        day = invoice_day(date)
+        if transaction.get_connection(router.db_for_write(InvoiceSequence)).in_atomic_block:
+            # a block reserved inside the caller's transaction could be rolled
+            # back while this process still hands its numbers out
+            return next_invoice_number(date)
+        with self._lock:
+            pool = self._pools[day]
+            if not pool:
+                with transaction.atomic(using=router.db_for_write(InvoiceSequence)):
+                    last = InvoiceSequence.allocate(day, self.block_size)
+                pool.extend(range(last, last - self.block_size, -1))
+            return format_number(day, pool.pop())
+
+    def give_back(self, number):
+        match = NUMBER_RE.match(number or "")
+        if not match:
+            return
+        day = datetime.strptime(match.group(1), "%Y%m%d").date()
+        with self._lock:
+            pool = self._pools[day]
+            pool.append(int(match.group(2)))
+            pool.sort(reverse=True)
+
+
+BLOCK_SIZE = getattr(settings, "INVOICE_NUMBER_BLOCK_SIZE", 1)
+block_allocator = BlockAllocator(BLOCK_SIZE) if BLOCK_SIZE > 1 else None
@@ -0,0 +1,67 @@
+"""
+JSON lookups behind the product and customer pickers on the order entry
+screen. Products match on a SKU prefix, then on word prefixes through the
+search index, and only in-stock rows are offered; customers match on a name or phone prefix
+through the NOCASE indexes on Customer. Results are plain dicts,
+cached for PICKER_CACHE_TIMEOUT seconds per query; stock shown may be that
+old, and place_order() re-checks it on submit.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.functions import Collate
+
+from inventory import search
+from inventory.models import Product
+from .models import Customer
+
+LIMIT = 20
+MAX_LIMIT = 50
+CACHE_TIMEOUT = 30
+
+
+def _cached(kind, query, limit, load):
+    digest = hashlib.md5(query.lower().encode()).hexdigest()
+    key = f"picker:{kind}:{limit}:{digest}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = load()
+        cache.set(key, rows, getattr(settings, "PICKER_CACHE_TIMEOUT", CACHE_TIMEOUT))
+    return rows
+
+
+def _products(query, limit, using):
+    # ordered in the NOCASE index's collation, so the prefix scan stops at ``limit``
+    order = Collate("sku", "NOCASE") if connections[using].vendor == "sqlite" else "sku"
+    by_sku = [
+        dict(zip(("id", "name", "category", "price", "quantity"), row))
+        for row in Product.objects.using(using)
+        .filter(sku__istartswith=query, quantity__gt=0)
+        .order_by(order)
+        .values_list("id", "name", "category__name", "price", "quantity")[:limit]
+    ]
+    seen = {row["id"] for row in by_sku}
+    ranked = search.ranked_products(query, limit, using, in_stock=True)
+    return (by_sku + [row for row in ranked if row["id"] not in seen])[:limit]
+
+
+def products(query, limit=LIMIT):
+    query = query.strip()
+    if not query:
+        return []
+    using = router.db_for_read(Product)
+    return _cached("products", query, limit, lambda: _products(query, limit, using))
+
+
+def customers(query, limit=LIMIT):
+    query = query.strip()
+    if not query:
+        return []
+    return _cached("customers", query, limit, lambda: list(
+        Customer.objects.filter(Q(name__istartswith=query) | Q(phone__startswith=query))
+        .order_by("name", "pk")
+        .values("id", "name", "phone")[:limit]
+    ))
@@ -0,0 +1,213 @@
+"""
+Accounts receivable: the aging report and customer statements.
+
+Both are answered in SQL from the stored Order.balance and Payment rows,
+in a fixed number of queries whatever the customer count:
+
+* aging: a keyset page of customers that have an open order (one EXISTS
+  probe per customer down the name index, stopping at the page size), then
+  one grouped query summing those customers' open balances into the
+  current / 31-60 / 61-90 / 90+ day buckets by Order.date. The export is the
+  same grouped query over every open order.
+* statement: a customer's invoices (debits) and payments (credits) as one
+  UNION ALL, with the running balance taken by a SUM() OVER window in date
+  order, so any page of it comes with the right balance carried forward.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connections, router
+from django.db.models import Count, DateTimeField, Exists, Min, OuterRef, Q, Sum, Value
+from django.utils import timezone
+
+from inventory.exports import CHUNK_SIZE, Export
+
+from .models import Customer, Order, Payment
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+# (key, label, age in days from, to); an invoice is N days old from its local date
+BUCKETS = [
+    ("current", "Current", 0, 30),
+    ("days_31_60", "31-60 days", 31, 60),
+    ("days_61_90", "61-90 days", 61, 90),
+    ("days_over_90", "90+ days", 91, None),
+]
+
+
+def _money(value):
+    # SQLite hands back SUM() of a decimal column unscaled (or as a float from raw SQL)
+    if value is None:
+        return ZERO
+    return (value if isinstance(value, Decimal) else Decimal(str(value))).quantize(CENT)
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def bucket_filters(today=None):
+    """``{key: Q}`` selecting the orders that fall in each bucket as of ``today``."""
+    today = today or timezone.localdate()
+    filters = {}
+    for key, _label, start, end in BUCKETS:
+        q = Q(date__lt=_midnight(today - timedelta(days=start - 1))) if start else Q()
+        if end is not None:
+            q &= Q(date__gte=_midnight(today - timedelta(days=end)))
+        filters[key] = q
+    return filters
+
+
+def _bucket_sums(today=None):
+    return {key: Sum("balance", filter=q, default=ZERO) for key, q in bucket_filters(today).items()}
+
+
+def open_orders():
+    return Order.objects.filter(balance__gt=0)
+
+
+# ---------- Aging ----------
+def customers_with_balance():
+    """Customers with at least one open order; paginate on ``name``."""
+    return Customer.objects.filter(Exists(open_orders().filter(customer=OuterRef("pk"))))
+
+
+def attach_aging(customers, today=None):
+    """Set ``customer.aging`` (bucket sums, ``total``, ``oldest``) on each customer, in one query."""
+    customers = list(customers)
+    rows = {
+        row.pop("customer_id"): row
+        for row in open_orders().filter(customer_id__in=[c.pk for c in customers])
+        .values("customer_id").order_by()
+        .annotate(**_bucket_sums(today), total=Sum("balance"), oldest=Min("date"))
+    }
+    for customer in customers:
+        row = rows.get(customer.pk, {})
+        customer.aging = {key: _money(row.get(key)) for key, *_ in BUCKETS}
+        customer.aging.update(total=_money(row.get("total")), oldest=row.get("oldest"))
+    return customers
+
+
+def aging_totals(today=None):
+    """Bucket sums, ``total`` and ``orders`` over every open order."""
+    row = open_orders().aggregate(**_bucket_sums(today), total=Sum("balance", default=ZERO), orders=Count("pk"))
+    return {key: value if key == "orders" else _money(value) for key, value in row.items()}
+
+
+class AgingExport(Export):
+    """One row per customer with an open balance, in name order."""
+
+    def __init__(self, today=None):
+        queryset = (
+            open_orders().values("customer_id").order_by()
+            .annotate(**_bucket_sums(today), total=Sum("balance"), orders=Count("pk"), oldest=Min("date"))
+        )
+        super().__init__("ar-aging", queryset, [
+            ("Customer ID", "customer_id"),
+            ("Customer", "customer__name"),
+            ("Phone", "customer__phone"),
+            ("Open orders", "orders"),
+            ("Oldest invoice", "oldest"),
+            *[(label, key) for key, label, *_ in BUCKETS],
+            ("Total", "total"),
+        ], ordering=("customer__name", "customer_id"))
+
+    def rows(self, queryset=None):
+        for row in super().rows(queryset):
+            yield [_money(value) if isinstance(value, (Decimal, float)) else value for value in row]
+
+
+# ---------- Statements ----------
+class Statement:
+    """
+    A customer's invoices and payments in date order with a running balance.
+    Sliceable and countable, so it goes straight into a Paginator; each
+    slice is one query.
+    """
+
+    headers = ["Date", "Type", "Invoice", "Order ID", "Method", "Reference", "Debit", "Credit", "Balance"]
+    fields = ["date", "kind", "invoice", "order_id", "method", "reference", "debit", "credit", "balance"]
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.name = f"statement-{customer_id}"
+
+    def _connection(self):
+        return connections[router.db_for_read(Order)]
+
+    def _sql(self, connection):
+        qn = connection.ops.quote_name
+        orders, payments = qn(Order._meta.db_table), qn(Payment._meta.db_table)
+        lines = (
+            f"SELECT 'invoice' AS kind, 0 AS seq, o.id, o.date, o.invoice_number AS invoice, o.id AS order_id, "
+            f"NULL AS method, NULL AS reference, o.total AS debit, 0 AS credit "
+            f"FROM {orders} o WHERE o.customer_id = %s "
+            f"UNION ALL "
+            f"SELECT 'payment', 1, p.id, p.date, o.invoice_number, o.id, p.method, p.reference, 0, p.amount "
+            f"FROM {payments} p INNER JOIN {orders} o ON o.id = p.order_id WHERE o.customer_id = %s"
+        )
+        return lines, [self.customer_id, self.customer_id]
+
+    def count(self):
+        connection = self._connection()
+        lines, params = self._sql(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM ({lines}) lines", params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def lines(self, offset=0, limit=None):
+        """Statement lines as dicts; ``limit`` lines from ``offset`` on, or all of them."""
+        connection = self._connection()
+        lines, params = self._sql(connection)
+        sql = (
+            "SELECT date, kind, invoice, order_id, method, reference, debit, credit, "
+            "SUM(debit - credit) OVER (ORDER BY date, seq, id ROWS UNBOUNDED PRECEDING) AS balance "
+            f"FROM ({lines}) lines ORDER BY date, seq, id"
+        )
+        if limit is not None:
+            # the window runs before LIMIT, so a later page still carries the balance forward
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        date = Value(None, output_field=DateTimeField())
+        converters = connection.ops.get_db_converters(date)
+        # chunked: a server-side cursor on PostgreSQL, so a long statement streams
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(CHUNK_SIZE):
+                for row in rows:
+                    line = dict(zip(self.fields, row))
+                    for converter in converters:
+                        line["date"] = converter(line["date"], date, connection)
+                    for key in ("debit", "credit", "balance"):
+                        line[key] = _money(line[key])
+                    yield line
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step or index.stop is None:
+            raise TypeError("Statement only supports bounded slices.")
+        start = index.start or 0
+        return list(self.lines(start, max(index.stop - start, 0)))
+
+    def rows(self, queryset=None):
+        """Rows for inventory.exports.response()."""
+        for line in self.lines():
+            yield [line[name] for name in self.fields]
+
+
+def customer_summary(customer_id, today=None):
+    """Invoiced, paid and open totals of one customer, with their aging buckets."""
+    filters = bucket_filters(today)
+    row = Order.objects.filter(customer_id=customer_id).aggregate(
+        orders=Count("pk"),
+        invoiced=Sum("total", default=ZERO),
+        paid=Sum("amount_paid", default=ZERO),
+        outstanding=Sum("balance", default=ZERO),
+        **{
+            key: Sum("balance", filter=Q(balance__gt=0) & q, default=ZERO)
+            for key, q in filters.items()
+        },
+    )
+    return {key: value if key == "orders" else _money(value) for key, value in row.items()}
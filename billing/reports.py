@@ -0,0 +1,61 @@
+"""Sales reports answered from the rollup tables in billing.rollups."""
+from decimal import Decimal
+
+from django.db.models import F, Sum
+
+from .models import DailyPaymentTotal, DailyProductSales, DailySales
+
+CENT = Decimal("0.01")
+
+
+def _money(row):
+    # SQLite hands back SUM() of a decimal column unscaled
+    return {key: value.quantize(CENT) if isinstance(value, Decimal) else value for key, value in row.items()}
+
+
+def revenue_by_day(start, end):
+    return list(
+        DailySales.objects.filter(day__range=(start, end), order_count__gt=0)
+        .values("day", "order_count", "subtotal", "tax", "discount", "total")
+    )
+
+
+def totals(start, end):
+    return _money(DailySales.objects.filter(day__range=(start, end)).aggregate(
+        order_count=Sum("order_count", default=0), subtotal=Sum("subtotal", default=Decimal(0)),
+        tax=Sum("tax", default=Decimal(0)), discount=Sum("discount", default=Decimal(0)),
+        total=Sum("total", default=Decimal(0)),
+    ))
+
+
+def top_products(start, end, limit=10, order_by="revenue"):
+    rows = (
+        DailyProductSales.objects.filter(day__range=(start, end))
+        .values("product_id", name=F("product__name"))
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by(f"-{order_by}", "product_id")[:limit]
+    )
+    return [_money(row) for row in rows]
+
+
+def sales_by_category(start, end):
+    rows = (
+        DailyProductSales.objects.filter(day__range=(start, end))
+        .values("category_id", name=F("category__name"))
+        .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by("-revenue", "category_id")
+    )
+    return [_money(row) for row in rows]
+
+
+def payments_by_method(start, end):
+    rows = (
+        DailyPaymentTotal.objects.filter(day__range=(start, end))
+        .values("method")
+        .annotate(payment_count=Sum("payment_count"), amount=Sum("amount"))
+        .filter(payment_count__gt=0)
+        .order_by("-amount", "method")
+    )
+    return [_money(row) for row in rows]
@@ -0,0 +1,187 @@
+"""
+Incrementally maintained sales rollups.
+
+DailySales, DailyProductSales and DailyPaymentTotal hold per-day sums that
+billing.signals and billing.services keep current on every order, order item
+and payment write, so reports read a few rows per day instead of scanning
+OrderItem. rebuild() recomputes any date range from the raw rows.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyPaymentTotal, DailyProductSales, DailySales, Order, OrderItem, Payment
+
+ZERO = Decimal("0.00")
+
+
+def local_day(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def add(model, keys, rows, replace=()):
+    """
+    Add every other field of each row onto the rollup row identified by
+    ``keys``, creating it when missing, in one INSERT ... ON CONFLICT DO
+    UPDATE. Fields named in ``replace`` are overwritten instead of summed.
+    """
+    merged = {}
+    for row in rows:
+        key = tuple(row[name] for name in keys)
+        if key in merged:
+            for name, value in row.items():
+                if name not in keys and name not in replace:
+                    merged[key][name] += value
+                else:
+                    merged[key][name] = value
+        else:
+            merged[key] = dict(row)
+    rows = [row for row in merged.values() if any(row[n] for n in row if n not in keys and n not in replace)]
+    if not rows:
+        return
+
+    names = list(rows[0])
+    deltas = [n for n in names if n not in keys and n not in replace]
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor not in ("sqlite", "postgresql"):
+        with transaction.atomic(using=connection.alias):
+            for row in rows:
+                lookup = {n: row[n] for n in keys}
+                changes = {n: F(n) + row[n] for n in deltas}
+                changes.update({n: row[n] for n in replace})
+                if not model.objects.filter(**lookup).update(**changes):
+                    model.objects.create(**row)
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    fields = [model._meta.get_field(n) for n in names]
+    columns = {n: qn(f.column) for n, f in zip(names, fields)}
+    assignments = [f"{columns[n]} = {table}.{columns[n]} + excluded.{columns[n]}" for n in deltas]
+    assignments += [f"{columns[n]} = excluded.{columns[n]}" for n in replace]
+    values = ", ".join(["(" + ", ".join(["%s"] * len(names)) + ")"] * len(rows))
+    params = [f.get_db_prep_save(row[n], connection) for row in rows for n, f in zip(names, fields)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns.values())}) VALUES {values} "
+            f"ON CONFLICT ({', '.join(columns[n] for n in keys)}) DO UPDATE SET {', '.join(assignments)}",
+            params,
+        )
+
+
+# ---------- Incremental updates ----------
+def record_order(day, subtotal, tax, discount, total, sign=1):
+    add(DailySales, ["day"], [{
+        "day": day, "order_count": sign,
+        "subtotal": sign * subtotal, "tax": sign * tax, "discount": sign * discount, "total": sign * total,
+    }])
+
+
+def record_items(day, lines, sign=1):
+    """``lines`` are ``(product_id, category_id, quantity, line_total)`` tuples."""
+    add(DailyProductSales, ["day", "product_id"], [
+        {"day": day, "product_id": product_id, "category_id": category_id,
+         "quantity": sign * quantity, "revenue": sign * line_total}
+        for product_id, category_id, quantity, line_total in lines
+    ], replace=["category_id"])
+
+
+def record_payment(day, method, amount, sign=1):
+    add(DailyPaymentTotal, ["day", "method"], [
+        {"day": day, "method": method, "payment_count": sign, "amount": sign * amount},
+    ])
+
+
+def order_lines(order_id):
+    return list(
+        OrderItem.objects.filter(order_id=order_id)
+        .values_list("product_id", "product__category_id", "quantity", "line_total")
+    )
+
+
+def move_order(order_id, old_day, new_day):
+    """Shift an order's item sales when its date moves to another day."""
+    lines = order_lines(order_id)
+    record_items(old_day, lines, sign=-1)
+    record_items(new_day, lines)
+
+
+def sync_product_category(product):
+    DailyProductSales.objects.filter(product=product).exclude(category_id=product.category_id).update(
+        category_id=product.category_id
+    )
+
+
+# ---------- Backfill ----------
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.combine(start, time.min), tz) if start else None
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz) if end else None
+    return lower, upper
+
+
+def _in_range(queryset, field, start, end):
+    lower, upper = _day_bounds(start, end)
+    if lower:
+        queryset = queryset.filter(**{f"{field}__gte": lower})
+    if upper:
+        queryset = queryset.filter(**{f"{field}__lt": upper})
+    return queryset
+
+
+def _days(queryset, start, end):
+    if start:
+        queryset = queryset.filter(day__gte=start)
+    if end:
+        queryset = queryset.filter(day__lte=end)
+    return queryset
+
+
+@transaction.atomic
+def rebuild(start=None, end=None, batch_size=1000):
+    """
+    Recompute the rollups for days ``start``..``end`` (inclusive, either may
+    be None for open-ended) from Order, OrderItem and Payment with three
+    grouped queries. Returns the number of rollup rows written per table.
+    """
+    for model in (DailySales, DailyProductSales, DailyPaymentTotal):
+        _days(model.objects.all(), start, end).delete()
+
+    orders = (
+        _in_range(Order.objects.all(), "date", start, end)
+        .annotate(day=TruncDate("date")).values("day").order_by("day")
+        .annotate(order_count=Count("pk"), subtotal=Sum("subtotal"), tax=Sum("tax"),
+                  discount=Sum("discount"), total=Sum("total"))
+    )
+    items = (
+        _in_range(OrderItem.objects.all(), "order__date", start, end)
+        .annotate(day=TruncDate("order__date")).values("day", "product_id", "product__category_id")
+        .order_by("day", "product_id")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("line_total"))
+    )
+    payments = (
+        _in_range(Payment.objects.all(), "date", start, end)
+        .annotate(day=TruncDate("date")).values("day", "method").order_by("day", "method")
+        .annotate(payment_count=Count("pk"), amount=Sum("amount"))
+    )
+
+    written = {}
+    written["sales"] = len(DailySales.objects.bulk_create(
+        (DailySales(**row) for row in orders.iterator()), batch_size=batch_size
+    ))
+    written["products"] = len(DailyProductSales.objects.bulk_create(
+        (
+            DailyProductSales(day=row["day"], product_id=row["product_id"], category_id=row["product__category_id"],
+                              quantity=row["quantity"], revenue=row["revenue"])
+            for row in items.iterator()
+        ),
+        batch_size=batch_size,
+    ))
+    written["payments"] = len(DailyPaymentTotal.objects.bulk_create(
+        (DailyPaymentTotal(**row) for row in payments.iterator()), batch_size=batch_size
+    ))
+    return written
@@ -0,0 +1,198 @@
+import random
+import time
+from decimal import Decimal
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Abs, Coalesce
+from django.utils import timezone
+
+from inventory import ledger, scan
+from inventory.models import Product
+from . import numbering, rollups
+from .models import Order, OrderItem, Payment
+
+
+class OrderError(Exception):
+    pass
+
+
+class EmptyOrder(OrderError):
+    def __init__(self):
+        super().__init__("Add at least one product quantity.")
+
+
+class StockBusy(OrderError):
+    def __init__(self):
+        super().__init__("Stock is being updated by another checkout, please try again.")
+
+
+class InsufficientStock(OrderError):
+    def __init__(self, products):
+        self.products = products
+        names = ", ".join(p.name for p in products)
+        super().__init__(f"Not enough stock for {names}.")
+
+
+def parse_order_lines(data, prefix="product_"):
+    """Return {product_id: qty} for every ``product_<id>`` key with a positive quantity."""
+    lines = {}
+    for key, raw in data.items():
+        if not key.startswith(prefix) or not raw:
+            continue
+        try:
+            product_id = int(key[len(prefix):])
+            qty = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if qty > 0:
+            lines[product_id] = lines.get(product_id, 0) + qty
+    return lines
+
+
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 0.02  # seconds, doubled per attempt and jittered
+
+
+def _qty_per_product(lines):
+    return Case(
+        *[When(pk=product_id, then=Value(qty)) for product_id, qty in lines.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _short_products(lines):
+    products = Product.objects.filter(pk__in=list(lines))
+    return [p for p in products if p.quantity < lines[p.pk]]
+
+
+def reserve_stock(lines):
+    """
+    Decrement stock for all ``{product_id: qty}`` lines with one conditional
+    UPDATE ... SET quantity = quantity - n WHERE quantity >= n. Either every
+    line is reserved or InsufficientStock is raised; must run inside the
+    caller's transaction so a partial match is rolled back.
+    """
+    updated = Product.objects.filter(
+        pk__in=list(lines), quantity__gte=_qty_per_product(lines)
+    ).update(quantity=F("quantity") - _qty_per_product(lines), updated_at=timezone.now())
+    if updated != len(lines):
+        raise InsufficientStock(_short_products(lines))
+    scan.forget(*lines)
+
+
+@transaction.atomic
+def create_order(customer, lines, tax=Decimal("0.00"), discount=Decimal("0.00"),
+                 payment_status="unpaid", created_by=None, date=None, invoice_number=""):
+    """
+    Build an order from ``{product_id: qty}`` lines with a constant number of
+    queries: one locked product fetch, the order insert, one bulk item insert,
+    one conditional stock UPDATE for all lines, one bulk ledger insert and
+    the sales rollup upserts.
+    """
+    if not lines:
+        raise EmptyOrder()
+
+    products = Product.objects.select_for_update().in_bulk(list(lines))
+    if len(products) != len(lines):
+        raise OrderError("One or more selected products no longer exist.")
+
+    short = [p for pk, p in products.items() if p.quantity < lines[pk]]
+    if short:
+        raise InsufficientStock(short)
+
+    items = []
+    subtotal = Decimal("0.00")
+    for product_id, qty in lines.items():
+        product = products[product_id]
+        line_total = (product.price * qty).quantize(Decimal("0.01"))
+        subtotal += line_total
+        items.append(OrderItem(product=product, unit_price=product.price, quantity=qty, line_total=line_total))
+
+    order_kwargs = {"date": date} if date else {}
+    order = Order.objects.create(
+        customer=customer,
+        created_by=created_by,
+        tax=tax,
+        discount=discount,
+        subtotal=subtotal,
+        total=(subtotal + tax - discount).quantize(Decimal("0.01")),
+        payment_status=payment_status,
+        invoice_number=invoice_number,
+        **order_kwargs,
+    )
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
+    rollups.record_items(
+        rollups.local_day(order.date),
+        [(item.product_id, item.product.category_id, item.quantity, item.line_total) for item in items],
+    )
+
+    reserve_stock(lines)
+    ledger.record({product_id: -qty for product_id, qty in lines.items()}, notes=f"Order {order.invoice_number}")
+
+    return order
+
+
+def _is_write_conflict(exc):
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def place_order(customer, lines, attempts=RETRY_ATTEMPTS, **kwargs):
+    """
+    create_order() with bounded, jittered retry when the database reports a
+    write conflict (SQLite "database is locked"). Stock shortfalls are never
+    retried. Inside an outer transaction a retry cannot help, so conflicts
+    surface immediately.
+
+    With INVOICE_NUMBER_BLOCK_SIZE > 1 the invoice number comes from this
+    process's pre-allocated block and goes back to the pool if the order
+    fails.
+    """
+    allocator = None
+    if numbering.block_allocator and not kwargs.get("invoice_number") and not connection.in_atomic_block:
+        allocator = numbering.block_allocator
+        kwargs["invoice_number"] = allocator.take(kwargs.get("date") or timezone.now())
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                return create_order(customer, lines, **kwargs)
+            except OperationalError as exc:
+                if not _is_write_conflict(exc) or connection.in_atomic_block:
+                    raise
+                if attempt == attempts:
+                    raise StockBusy() from exc
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+    except Exception:
+        if allocator:
+            allocator.give_back(kwargs["invoice_number"])
+        raise
+
+
+def _payments_sum():
+    paid = Payment.objects.filter(order=OuterRef("pk")).values("order").annotate(s=Sum("amount")).values("s")
+    return Coalesce(Subquery(paid), Value(Decimal("0.00")))
+
+
+def stale_payment_totals(orders=None):
+    """Orders whose stored amount_paid disagrees with their payments."""
+    orders = Order.objects.all() if orders is None else orders
+    return orders.annotate(
+        actual_paid=_payments_sum(),
+        drift=Abs(F("amount_paid") - F("actual_paid")),
+    ).filter(drift__gte=Decimal("0.005"))
+
+
+@transaction.atomic
+def rebuild_payment_totals(orders=None):
+    """Recompute amount_paid, balance and payment_status with two set-based UPDATEs."""
+    orders = Order.objects.all() if orders is None else orders
+    updated = orders.update(amount_paid=_payments_sum())
+    orders.update(
+        balance=F("total") - F("amount_paid"),
+        updated_at=timezone.now(),
+        payment_status=Order.payment_status_expression(F("amount_paid")),
+    )
+    return updated
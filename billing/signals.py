@@ -0,0 +1,164 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from inventory.models import Product
+from . import invoices, rollups
+from .models import Order, OrderItem, Payment
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, **kwargs):
+    instance._previous = None
+    if instance.pk:
+        instance._previous = (
+            Payment.objects.filter(pk=instance.pk).values_list("order_id", "amount", "method", "date").first()
+        )
+
+
+@receiver(post_save, sender=Payment)
+def apply_payment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous is None:
+        Order.apply_payment_delta(instance.order_id, instance.amount)
+        return
+    old_order_id, old_amount = previous[:2]
+    if old_order_id == instance.order_id:
+        if instance.amount != old_amount:
+            Order.apply_payment_delta(instance.order_id, instance.amount - old_amount)
+        else:
+            Order.touch(instance.order_id)  # method, reference or date changed
+    else:
+        Order.apply_payment_delta(old_order_id, -old_amount)
+        Order.apply_payment_delta(instance.order_id, instance.amount)
+
+
+@receiver(post_delete, sender=Payment)
+def apply_payment_deleted(sender, instance, **kwargs):
+    Order.apply_payment_delta(instance.order_id, -instance.amount)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def purge_cached_invoice(sender, instance, **kwargs):
+    invoices.purge(instance.pk)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def purge_cached_invoice_for_child(sender, instance, **kwargs):
+    invoices.purge(instance.order_id)
+
+
+# ---------- Sales rollups ----------
+ORDER_TOTALS = ("date", "subtotal", "tax", "discount", "total")
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_order(sender, instance, update_fields=None, **kwargs):
+    instance._previous_totals = None
+    if update_fields is not None and not set(update_fields) & set(ORDER_TOTALS):
+        return  # e.g. save(update_fields=["notes"]) cannot move the rollups
+    if not instance._state.adding:
+        instance._previous_totals = Order.objects.filter(pk=instance.pk).values_list(*ORDER_TOTALS).first()
+
+
+@receiver(post_save, sender=Order)
+def roll_up_order_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_totals", None)
+    if previous:
+        if tuple(previous) == tuple(getattr(instance, name) for name in ORDER_TOTALS):
+            return  # a notes or status edit
+        old_date, *old_totals = previous
+        rollups.record_order(rollups.local_day(old_date), *old_totals, sign=-1)
+        if rollups.local_day(old_date) != rollups.local_day(instance.date):
+            rollups.move_order(instance.pk, rollups.local_day(old_date), rollups.local_day(instance.date))
+    elif not created:
+        return
+    rollups.record_order(
+        rollups.local_day(instance.date), instance.subtotal, instance.tax, instance.discount, instance.total
+    )
+
+
+@receiver(post_delete, sender=Order)
+def roll_up_order_deleted(sender, instance, **kwargs):
+    rollups.record_order(
+        rollups.local_day(instance.date), instance.subtotal, instance.tax, instance.discount, instance.total,
+        sign=-1,
+    )
+
+
+def _item_line(order_id, product_id, quantity, line_total):
+    day = rollups.local_day(Order.objects.values_list("date", flat=True).get(pk=order_id))
+    category_id = Product.objects.values_list("category_id", flat=True).get(pk=product_id)
+    return day, [(product_id, category_id, quantity, line_total)]
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_previous_item(sender, instance, **kwargs):
+    instance._previous = None
+    if not instance._state.adding:
+        instance._previous = (
+            OrderItem.objects.filter(pk=instance.pk)
+            .values_list("order_id", "product_id", "quantity", "line_total").first()
+        )
+
+
+@receiver(post_save, sender=OrderItem)
+def roll_up_item_saved(sender, instance, **kwargs):
+    # bulk_create() in services.create_order bypasses this and records its lines directly
+    previous = getattr(instance, "_previous", None)
+    if previous:
+        rollups.record_items(*_item_line(*previous), sign=-1)
+    rollups.record_items(
+        *_item_line(instance.order_id, instance.product_id, instance.quantity, instance.line_total)
+    )
+
+
+@receiver(post_delete, sender=OrderItem)
+def roll_up_item_deleted(sender, instance, **kwargs):
+    rollups.record_items(
+        *_item_line(instance.order_id, instance.product_id, instance.quantity, instance.line_total), sign=-1
+    )
+
+
+@receiver(post_save, sender=Payment)
+def roll_up_payment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous:
+        _order_id, amount, method, date = previous
+        rollups.record_payment(rollups.local_day(date), method, amount, sign=-1)
+    rollups.record_payment(rollups.local_day(instance.date), instance.method, instance.amount)
+
+
+@receiver(post_delete, sender=Payment)
+def roll_up_payment_deleted(sender, instance, **kwargs):
+    rollups.record_payment(rollups.local_day(instance.date), instance.method, instance.amount, sign=-1)
+
+
+@receiver(post_save, sender=Product)
+def roll_up_product_category(sender, instance, created, **kwargs):
+    if not created:
+        rollups.sync_product_category(instance)
+
+
+# ---------- Fragment cache versions (updated_at) ----------
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def touch_order_for_item(sender, instance, **kwargs):
+    Order.touch(instance.order_id)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_product_name(sender, instance, **kwargs):
+    instance._previous_name = None
+    if not instance._state.adding:
+        instance._previous_name = Product.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def touch_orders_for_renamed_product(sender, instance, created, **kwargs):
+    # order pages and invoices show the current product name
+    if not created and getattr(instance, "_previous_name", None) not in (None, instance.name):
+        Order.touch_for_products(instance.pk)
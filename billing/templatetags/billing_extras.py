@@ -1,9 +1,10 @@
+from decimal import Decimal, InvalidOperation
 from django import template
 register = template.Library()
 
 @register.filter
 def mul(value, arg):
     try:
-        return float(value) * float(arg)
-    except Exception:
+        return Decimal(str(value)) * Decimal(str(arg))
+    except (InvalidOperation, TypeError, ValueError):
         return 0
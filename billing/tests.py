@@ -1,3 +1,582 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Category, Product
+from .models import Customer, DailyPaymentTotal, DailyProductSales, DailySales, InvoiceSequence, Order, Payment
+from . import benchmarks, receivables, rollups
+from .numbering import BlockAllocator
+from . import services
+from .services import (
+    InsufficientStock, StockBusy, create_order, parse_order_lines, place_order, rebuild_payment_totals,
+    stale_payment_totals,
+)
+
+
+class OrderCreateServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Filters")
+        cls.products = Product.objects.bulk_create(
+            Product(category=cls.category, name=f"Part {i}", price=Decimal("10.00"), quantity=5)
+            for i in range(20)
+        )
+        cls.customer = Customer.objects.create(name="Ali")
+
+    def test_parse_order_lines_skips_blank_and_invalid(self):
+        data = {"product_1": "2", "product_2": "", "product_3": "0", "product_x": "1", "customer": "4"}
+        self.assertEqual(parse_order_lines(data), {1: 2})
+
+    def test_query_count_is_flat_in_number_of_lines(self):
+        counts = []
+        for size in (1, 20):
+            lines = {p.pk: 1 for p in self.products[:size]}
+            with CaptureQueriesContext(connection) as ctx:
+                create_order(self.customer, lines)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_totals_and_stock(self):
+        p1, p2 = self.products[:2]
+        order = create_order(self.customer, {p1.pk: 2, p2.pk: 3}, tax=Decimal("5.00"), discount=Decimal("1.00"))
+        self.assertEqual(order.subtotal, Decimal("50.00"))
+        self.assertEqual(order.total, Decimal("54.00"))
+        self.assertEqual(order.items.count(), 2)
+        p1.refresh_from_db()
+        p2.refresh_from_db()
+        self.assertEqual((p1.quantity, p2.quantity), (3, 2))
+
+    def test_insufficient_stock_rolls_back(self):
+        p1, p2 = self.products[:2]
+        with self.assertRaises(InsufficientStock):
+            create_order(self.customer, {p1.pk: 1, p2.pk: 6})
+        self.assertFalse(Order.objects.exists())
+        p1.refresh_from_db()
+        self.assertEqual(p1.quantity, 5)
+
+    def test_view_reports_insufficient_stock(self):
+        p1 = self.products[0]
+        response = self.client.post(
+            reverse("billing:order_create"),
+            {"customer": self.customer.pk, "product_%d" % p1.pk: "9"},
+            follow=True,
+        )
+        self.assertContains(response, "Not enough stock for Part 0.")
+        self.assertFalse(Order.objects.exists())
+
+
+class PaymentTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Ali")
+
+    def setUp(self):
+        self.order = Order.objects.create(customer=self.customer, total=Decimal("100.00"))
+
+    def test_payment_create_edit_delete_keeps_amount_paid_in_sync(self):
+        payment = Payment.objects.create(order=self.order, amount=Decimal("40.00"))
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.amount_paid, self.order.balance), (Decimal("40.00"), Decimal("60.00")))
+        self.assertEqual(self.order.payment_status, "partial")
+
+        payment.amount = Decimal("100.00")
+        payment.save()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.balance, self.order.payment_status), (Decimal("0.00"), "paid"))
+
+        payment.delete()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.amount_paid, self.order.payment_status), (Decimal("0.00"), "unpaid"))
+
+    def test_full_save_of_a_stale_instance_keeps_payments(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        Payment.objects.create(order=self.order, amount=Decimal("40.00"))
+        stale.notes = "call before delivery"
+        stale.save()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.amount_paid, self.order.balance), (Decimal("40.00"), Decimal("60.00")))
+        self.assertEqual((self.order.payment_status, self.order.notes), ("partial", "call before delivery"))
+
+    def test_rebuild_fixes_stale_totals(self):
+        Payment.objects.create(order=self.order, amount=Decimal("25.00"))
+        Order.objects.filter(pk=self.order.pk).update(amount_paid=0, balance=0)
+        self.assertEqual(stale_payment_totals().count(), 1)
+        rebuild_payment_totals()
+        self.assertFalse(stale_payment_totals().exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.balance, Decimal("75.00"))
+
+
+class InvoicePdfCacheTests(TestCase):
+    def setUp(self):
+        self.storage = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage, ignore_errors=True)
+        override = override_settings(INVOICE_STORAGE_PATH=self.storage)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch("billing.invoices.render_pdf", return_value=b"%PDF-1.4 test")
+        self.render_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.order = Order.objects.create(customer=Customer.objects.create(name="Ali"), total=Decimal("10.00"))
+        self.url = reverse("billing:invoice_pdf", args=[self.order.pk])
+
+    def test_second_request_is_served_from_disk(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(self.render_pdf.call_count, 1)
+        self.assertEqual(b"".join(second.streaming_content), b"%PDF-1.4 test")
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_order_change_invalidates(self):
+        etag = self.client.get(self.url)["ETag"]
+        Payment.objects.create(order=self.order, amount=Decimal("4.00"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.render_pdf.call_count, 2)
+        self.assertEqual(len(os.listdir(os.path.join(self.storage, str(self.order.pk)))), 1)
+
+
+class RenderInvoicesBatchTests(TestCase):
+    def setUp(self):
+        self.storage = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage, ignore_errors=True)
+        override = override_settings(INVOICE_STORAGE_PATH=self.storage)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch("billing.invoices.render_pdf", return_value=b"%PDF-1.4 test")
+        self.render_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        customer = Customer.objects.create(name="Ali")
+        self.orders = [Order.objects.create(customer=customer) for _ in range(3)]
+
+    def test_renders_once_and_zips(self):
+        zip_path = os.path.join(self.storage, "batch.zip")
+        out = StringIO()
+        call_command("render_invoices", "--from", "2000-01-01", "--workers", "0", "--zip", zip_path, stdout=out)
+        self.assertIn("Rendered 3, skipped 0", out.getvalue())
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()), sorted(f"invoice_{o.invoice_number}.pdf" for o in self.orders)
+            )
+
+        out = StringIO()
+        call_command("render_invoices", "--ids", str(self.orders[0].pk), "--workers", "0", stdout=out)
+        self.assertIn("Rendered 0, skipped 1", out.getvalue())
+        self.assertEqual(self.render_pdf.call_count, 3)
+
+
+    def test_failures_are_reported(self):
+        self.render_pdf.side_effect = RuntimeError("no fonts")
+        out, err = StringIO(), StringIO()
+        call_command("render_invoices", "--ids", str(self.orders[0].pk), "--workers", "0", stdout=out, stderr=err)
+        self.assertIn(f"Order {self.orders[0].pk}: no fonts", err.getvalue())
+        self.assertIn("failed 1", out.getvalue())
+
+    def test_admin_action_runs_the_command_in_its_own_process(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser("admin", password=None))
+        with mock.patch("billing.admin.subprocess.Popen") as popen:
+            response = self.client.post(reverse("admin:billing_order_changelist"), {
+                "action": "generate_invoice_pdfs", "_selected_action": [o.pk for o in self.orders[:2]],
+            }, follow=True)
+        args = popen.call_args.args[0]
+        self.assertEqual(args[2], "render_invoices")
+        self.assertEqual(sorted(args[args.index("--ids") + 1:]), sorted(str(o.pk) for o in self.orders[:2]))
+        self.assertTrue(popen.call_args.kwargs["start_new_session"])
+        self.assertContains(response, "failures are listed in")
+
+
+class InvoiceRenderingQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Gears")
+        cls.products = Product.objects.bulk_create(
+            Product(category=category, name=f"Gear {i}", price=Decimal("3.00"), quantity=100) for i in range(15)
+        )
+        cls.customer = Customer.objects.create(name="Ali")
+
+    def _queries_for(self, lines):
+        order = create_order(self.customer, {p.pk: 2 for p in self.products[:lines]})
+        Payment.objects.create(order=order, amount=Decimal("1.00"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("billing:invoice_view", args=[order.pk]))
+        self.assertContains(response, "<td>Gear ", count=lines)
+        return len(ctx.captured_queries)
+
+    def test_invoice_view_query_count_does_not_grow_with_lines(self):
+        # order + customer, items, products, payments
+        self.assertEqual(self._queries_for(1), 4)
+        self.assertEqual(self._queries_for(15), 4)
+
+
+class InvoiceNumberingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="Ali")
+
+    def test_numbers_are_sequential_per_day_in_a_single_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            order = Order.objects.create(customer=self.customer)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")])
+        day = f"{order.date:%Y%m%d}"
+        second = Order.objects.create(customer=self.customer)
+        self.assertEqual(
+            [order.invoice_number, second.invoice_number], [f"INV-{day}-00001", f"INV-{day}-00002"]
+        )
+
+    def test_rolled_back_order_leaves_no_gap(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Order.objects.create(customer=self.customer)
+            Order.objects.create(customer=self.customer, invoice_number="duplicate")
+            Order.objects.create(customer=self.customer, invoice_number="duplicate")
+        self.assertTrue(Order.objects.create(customer=self.customer).invoice_number.endswith("-00001"))
+
+
+class BlockAllocatorTests(TransactionTestCase):
+    # TestCase's wrapping transaction would make the allocator fall back to gap-free mode
+    def test_reserves_a_block_once_and_reuses_returned_numbers(self):
+        allocator = BlockAllocator(10)
+        now = Order().date
+        first, second = allocator.take(now), allocator.take(now)
+        self.assertEqual(InvoiceSequence.objects.get().last_value, 10)
+        allocator.give_back(second)
+        self.assertEqual(allocator.take(now), second)
+        self.assertTrue(first.endswith("-00001"))
+
+
+class PlaceOrderRetryTests(TransactionTestCase):
+    # outside TestCase's transaction, or place_order would not retry at all
+    def setUp(self):
+        category = Category.objects.create(name="Filters")
+        self.product = Product.objects.create(category=category, name="Oil filter", price=Decimal("5.00"), quantity=10)
+        self.customer = Customer.objects.create(name="Ali")
+        sleep = mock.patch.object(services.time, "sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_gives_up_with_stock_busy_after_the_configured_attempts(self):
+        locked = OperationalError("database is locked")
+        with mock.patch.object(services, "create_order", side_effect=locked) as create:
+            with self.assertRaises(StockBusy):
+                place_order(self.customer, {self.product.pk: 1}, attempts=3)
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_one_transient_failure_then_success_creates_one_order(self):
+        calls = []
+
+        def flaky(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return create_order(*args, **kwargs)
+
+        with mock.patch.object(services, "create_order", side_effect=flaky):
+            order = place_order(self.customer, {self.product.pk: 2})
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(Order.objects.values_list("pk", flat=True)), [order.pk])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 8)
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.filters = Category.objects.create(name="Filters")
+        cls.belts = Category.objects.create(name="Belts")
+        cls.oil = Product.objects.create(category=cls.filters, name="Oil filter", price=Decimal("10.00"), quantity=50)
+        cls.belt = Product.objects.create(category=cls.belts, name="Fan belt", price=Decimal("4.00"), quantity=50)
+        cls.customer = Customer.objects.create(name="Ali")
+
+    def _snapshot(self):
+        return (
+            # rows decremented to zero are left in place by the incremental path
+            list(DailySales.objects.filter(order_count__gt=0).values_list("day", "order_count", "total")),
+            list(DailyProductSales.objects.filter(quantity__gt=0).values_list(
+                "day", "product", "category", "quantity", "revenue")),
+            list(DailyPaymentTotal.objects.filter(payment_count__gt=0).values_list(
+                "day", "method", "payment_count", "amount")),
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        first = create_order(self.customer, {self.oil.pk: 2, self.belt.pk: 1}, tax=Decimal("1.00"))
+        second = create_order(self.customer, {self.oil.pk: 1})
+        payment = Payment.objects.create(order=first, amount=Decimal("10.00"), method="card")
+        payment.method = "cash"
+        payment.save()
+        item = second.items.get()
+        item.quantity = 3
+        item.save()
+        second.delete()
+        self.belt.category = self.filters
+        self.belt.save()
+
+        incremental = self._snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self._snapshot())
+        self.assertEqual(DailyProductSales.objects.get(product=self.oil).quantity, 2)
+
+    def test_saves_that_leave_totals_alone_skip_the_rollups(self):
+        order = create_order(self.customer, {self.oil.pk: 1})
+        order.notes = "Call before delivery"
+        with CaptureQueriesContext(connection) as full:
+            order.save()
+        with CaptureQueriesContext(connection) as partial:
+            order.save(update_fields=["notes"])
+        self.assertFalse([q for q in full if "billing_dailysales" in q["sql"]])
+        # no SELECT of the previous totals (nor of amount_paid, which only a full
+        # save re-reads): just the UPDATE and the other handlers
+        self.assertEqual(len(partial), len(full) - 2)
+        self.assertEqual(DailySales.objects.get().order_count, 1)
+
+    def test_reports_read_rollups(self):
+        order = create_order(self.customer, {self.oil.pk: 3, self.belt.pk: 5})
+        Payment.objects.create(order=order, amount=Decimal("20.00"), method="bank")
+        day = order.date.date().isoformat()
+        params = {"from": day, "to": day}
+
+        with CaptureQueriesContext(connection) as ctx:
+            revenue = self.client.get(reverse("billing:report_revenue"), params).json()
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(revenue["totals"]["total"], "50.00")
+
+        top = self.client.get(reverse("billing:report_top_products"), {**params, "by": "quantity"}).json()
+        self.assertEqual([p["name"] for p in top["products"]], ["Fan belt", "Oil filter"])
+        categories = self.client.get(reverse("billing:report_categories"), params).json()
+        self.assertEqual([c["name"] for c in categories["categories"]], ["Filters", "Belts"])
+        payments = self.client.get(reverse("billing:report_payments"), params).json()
+        self.assertEqual(payments["methods"], [{"method": "bank", "payment_count": 1, "amount": "20.00"}])
+
+    def test_top_products_limit_is_clamped(self):
+        order = create_order(self.customer, {self.oil.pk: 3, self.belt.pk: 5})
+        day = order.date.date().isoformat()
+        for limit in ("-1", "0"):
+            response = self.client.get(reverse("billing:report_top_products"), {"from": day, "to": day, "limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["products"]), 1)
+
+    def test_bad_range_is_rejected(self):
+        response = self.client.get(reverse("billing:report_revenue"), {"from": "2024-02-01", "to": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderExportTests(TestCase):
+    def test_one_row_per_line_and_orders_without_lines(self):
+        category = Category.objects.create(name="Filters")
+        products = Product.objects.bulk_create(
+            Product(category=category, name=f"Part {i}", price=Decimal("1.00"), quantity=10) for i in range(2)
+        )
+        customer = Customer.objects.create(name="Ali")
+        with_lines = create_order(customer, {products[0].pk: 1, products[1].pk: 2})
+        empty = Order.objects.create(customer=customer)
+
+        response = self.client.get(reverse("billing:order_export"))
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual([row[1] for row in rows[1:]], [with_lines.invoice_number] * 2 + [empty.invoice_number])
+        self.assertEqual([row[13] for row in rows[1:]], ["Part 0", "Part 1", ""])
+
+
+class BenchmarkTests(TestCase):
+    def test_smoke_seed_runs_every_scenario(self):
+        counts = benchmarks.seed("smoke")
+        self.assertEqual(Order.objects.count(), counts["orders"])
+
+        # order_create numbers from the seeded InvoiceSequence rows without colliding
+        results = benchmarks.run(rounds=2, warmup=0, only={"order_detail", "order_create", "admin_orders"})
+        self.assertEqual(set(results), {"order_detail", "order_create", "admin_orders"})
+        self.assertLessEqual(results["order_detail"]["median_ms"], results["order_detail"]["max_ms"])
+
+        baseline = {"benchmarks": {"order_detail": {**results["order_detail"], "queries": 1}}}
+        [(name, _, _, _, regressed)] = benchmarks.compare(baseline, {"benchmarks": results})
+        self.assertTrue(regressed)  # more queries than the baseline
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches["fragments"].clear()
+        category = Category.objects.create(name="Filters")
+        self.product = Product.objects.create(category=category, name="Oil filter", price=Decimal("5.00"), quantity=10)
+        self.order = create_order(Customer.objects.create(name="Ali"), {self.product.pk: 2})
+        self.url = reverse("billing:order_detail", args=[self.order.pk])
+
+    def test_unchanged_order_is_served_from_cache(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(self.url)
+        self.assertContains(response, "Oil filter")
+        self.assertEqual(len(second.captured_queries), len(first.captured_queries) - 2)  # items, payments
+
+    def test_payments_and_renames_bump_the_version(self):
+        self.client.get(self.url)
+        Payment.objects.create(order=self.order, amount=Decimal("3.00"), method="card")
+        self.assertContains(self.client.get(self.url), "Card")
+
+        payment = Payment.objects.get()
+        payment.method = "bank"
+        payment.save()
+        self.assertContains(self.client.get(self.url), "Bank Transfer")
+
+        self.product.name = "Fuel filter"
+        self.product.save()
+        self.assertContains(self.client.get(self.url), "Fuel filter")
+        self.assertContains(self.client.get(reverse("billing:invoice_view", args=[self.order.pk])), "Fuel filter")
+
+
+class OrderPickerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Filters")
+        cls.in_stock = Product.objects.create(category=category, name="Oil filter", price=Decimal("5.00"), quantity=3)
+        Product.objects.create(category=category, name="Oil pump", price=Decimal("9.00"), quantity=0)
+        Customer.objects.bulk_create([
+            Customer(name="Ali Raza", phone="03001234567"),
+            Customer(name="Bilal", phone="03219876543"),
+            Customer(name="alina", phone=None),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_product_lookup_offers_in_stock_matches_only(self):
+        response = self.client.get(reverse("billing:product_lookup"), {"q": "oil"})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.in_stock.pk])
+
+    def test_customer_lookup_by_name_or_phone_prefix_and_cached(self):
+        url = reverse("billing:customer_lookup")
+        names = [row["name"] for row in self.client.get(url, {"q": "ali"}).json()["results"]]
+        self.assertEqual(names, ["Ali Raza", "alina"])
+        self.assertEqual([row["name"] for row in self.client.get(url, {"q": "0321"}).json()["results"]], ["Bilal"])
+        with self.assertNumQueries(0):
+            self.client.get(url, {"q": "0321"})
+
+    def test_prefix_lookups_use_the_nocase_indexes(self):
+        # created by the migrations, not by a post_migrate hook
+        plan = Customer.objects.filter(name__istartswith="ali").values("pk").explain()
+        self.assertIn("billing_customer_name_ci", plan)
+        plan = Product.objects.filter(sku__istartswith="of").values("pk").explain()
+        self.assertIn("inventory_product_sku_ci", plan)
+
+    def test_order_form_does_not_load_the_catalog(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("billing:order_create"))
+        self.assertNotContains(response, "Oil filter")
+
+
+class AdminPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        category = Category.objects.create(name="Filters")
+        cls.product = Product.objects.create(category=category, name="Oil filter", price=Decimal("5.00"), quantity=50)
+        cls.ali = Customer.objects.create(name="Ali Raza")
+        cls.bilal = Customer.objects.create(name="Bilal")
+        cls.order = create_order(cls.ali, {cls.product.pk: 1})
+        create_order(cls.bilal, {cls.product.pk: 2})
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _search(self, term):
+        response = self.client.get(reverse("admin:billing_order_changelist"), {"q": term})
+        return sorted(order.pk for order in response.context["cl"].result_list)
+
+    def test_order_search_matches_invoice_or_customer_prefixes(self):
+        self.assertEqual(self._search(self.order.invoice_number), [self.order.pk])
+        self.assertEqual(self._search("ali"), [self.order.pk])
+        self.assertEqual(self._search("Raza"), [])
+        self.assertEqual(len(self._search("INV-")), 2)
+
+    def test_order_change_page_uses_raw_id_inputs(self):
+        response = self.client.get(reverse("admin:billing_order_change", args=[self.order.pk]))
+        self.assertNotContains(response, "Oil filter (Filters)</option>")
+        self.assertNotContains(response, "Ali Raza</option>")
+
+
+class ReceivablesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def order(customer, total, days_ago):
+            return Order.objects.create(
+                customer=customer, total=Decimal(total), date=timezone.now() - timedelta(days=days_ago)
+            )
+
+        cls.ali = Customer.objects.create(name="Ali")
+        cls.bilal = Customer.objects.create(name="Bilal")
+        settled = Customer.objects.create(name="Zara")
+        order(cls.ali, "100.00", 0)
+        partial = order(cls.ali, "50.00", 45)
+        order(cls.ali, "70.00", 120)
+        order(cls.bilal, "40.00", 75)
+        Payment.objects.create(order=order(settled, "10.00", 5), amount=Decimal("10.00"))
+        payment = Payment.objects.create(order=partial, amount=Decimal("20.00"), reference="TXN1")
+        Payment.objects.filter(pk=payment.pk).update(date=partial.date + timedelta(days=1))
+
+    def test_aging_buckets_in_fixed_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("billing:ar_aging"))
+        ali, bilal = response.context["customers"]
+        self.assertEqual((ali.name, bilal.name), ("Ali", "Bilal"))
+        self.assertEqual(
+            [ali.aging[key] for key, *_ in receivables.BUCKETS] + [ali.aging["total"]],
+            [Decimal("100.00"), Decimal("30.00"), Decimal("0.00"), Decimal("70.00"), Decimal("200.00")],
+        )
+        self.assertEqual(bilal.aging["days_61_90"], Decimal("40.00"))
+        totals = response.context["totals"]
+        self.assertEqual((totals["total"], totals["orders"]), (Decimal("240.00"), 4))
+
+        rows = list(csv.reader(io.StringIO(
+            b"".join(self.client.get(reverse("billing:ar_aging_export")).streaming_content).decode("utf-8-sig")
+        )))
+        self.assertEqual([row[1] for row in rows[1:]], ["Ali", "Bilal"])
+        self.assertEqual(rows[1][-5:], ["100.00", "30.00", "0.00", "70.00", "200.00"])
+
+    def test_statement_running_balance_carries_across_pages(self):
+        statement = receivables.Statement(self.ali.pk)
+        self.assertEqual(statement.count(), 4)
+        lines = list(statement.lines())
+        self.assertEqual([line["kind"] for line in lines], ["invoice", "invoice", "payment", "invoice"])
+        self.assertEqual(
+            [line["balance"] for line in lines],
+            [Decimal("70.00"), Decimal("120.00"), Decimal("100.00"), Decimal("200.00")],
+        )
+        self.assertEqual(statement[2:4], lines[2:4])
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("billing:customer_statement", args=[self.ali.pk]))
+        self.assertEqual(response.context["summary"]["outstanding"], Decimal("200.00"))
+        self.assertContains(response, "TXN1")
+
+        body = b"".join(
+            self.client.get(reverse("billing:customer_statement_export", args=[self.ali.pk])).streaming_content
+        )
+        rows = list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))
+        self.assertEqual(rows[0], receivables.Statement.headers)
+        self.assertEqual([row[-1] for row in rows[1:]], ["70.00", "120.00", "100.00", "200.00"])
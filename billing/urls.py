@@ -6,16 +6,33 @@ app_name = "billing"
 urlpatterns = [
     # customers
     path("customers/", views.customer_list, name="customer_list"),
+    path("customers/export/", views.customer_export, name="customer_export"),
     path("customers/add/", views.customer_create, name="customer_create"),
     path("customers/<int:pk>/edit/", views.customer_edit, name="customer_edit"),
+    path("customers/<int:pk>/statement/", views.customer_statement, name="customer_statement"),
+    path("customers/<int:pk>/statement/export/", views.customer_statement_export, name="customer_statement_export"),
 
     # orders
     path("orders/", views.order_list, name="order_list"),
+    path("orders/export/", views.order_export, name="order_export"),
     path("orders/create/", views.order_create, name="order_create"),
+    path("orders/lookup/products.json", views.product_lookup, name="product_lookup"),
+    path("orders/lookup/customers.json", views.customer_lookup, name="customer_lookup"),
     path("orders/<int:pk>/", views.order_detail, name="order_detail"),
     path("orders/<int:pk>/add-payment/", views.add_payment, name="add_payment"),
+    path("payments/export/", views.payment_export, name="payment_export"),
 
     # invoice/pdf (optional if WeasyPrint installed)
     path("orders/<int:pk>/invoice/", views.invoice_view, name="invoice_view"),
     path("orders/<int:pk>/invoice.pdf", views.invoice_pdf, name="invoice_pdf"),
+
+    # accounts receivable
+    path("reports/aging/", views.ar_aging, name="ar_aging"),
+    path("reports/aging/export/", views.ar_aging_export, name="ar_aging_export"),
+
+    # sales reports (JSON)
+    path("reports/revenue.json", views.report_revenue, name="report_revenue"),
+    path("reports/top-products.json", views.report_top_products, name="report_top_products"),
+    path("reports/categories.json", views.report_categories, name="report_categories"),
+    path("reports/payments.json", views.report_payments, name="report_payments"),
 ]
@@ -1,20 +1,33 @@
+from datetime import date, timedelta
 from decimal import Decimal
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib import messages
-from django.db import transaction
-from django.utils.timezone import now
-from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.timezone import localdate, now
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 import os
 
-from inventory.models import Product
-from .models import Customer, Order, OrderItem, Payment
+from inventory.pagination import keyset_paginate, stream_table
+from inventory.routing import use_replica
+from .models import Customer, Order, Payment
 from .forms import CustomerForm, PaymentForm
+from . import exports, invoices, pickers, receivables, reports
+from .services import OrderError, parse_order_lines, place_order
 
 # ---------- Customers ----------
+@use_replica
 def customer_list(request):
-    customers = Customer.objects.order_by("-created_at")
-    return render(request, "billing/customer_list.html", {"customers": customers})
+    customers = Customer.objects.all()
+    if request.GET.get("stream") == "1":
+        return stream_table(
+            request, "billing/customer_list.html", {}, "billing/_customer_row.html",
+            customers.order_by("-created_at", "-pk"), "c",
+        )
+    page = keyset_paginate(request, customers, "-created_at")
+    return render(request, "billing/customer_list.html", {"customers": page})
 
 def customer_create(request):
     if request.method == "POST":
@@ -42,9 +55,20 @@ def customer_edit(request, pk):
     return render(request, "billing/customer_form.html", {"form": form, "title": "Edit Customer"})
 
 # ---------- Orders ----------
+@use_replica
 def order_list(request):
-    orders = Order.objects.select_related("customer").order_by("-date")
-    return render(request, "billing/order_list.html", {"orders": orders})
+    orders = Order.objects.select_related("customer")
+    outstanding = request.GET.get("outstanding") == "1"
+    if outstanding:
+        orders = orders.filter(balance__gt=0)
+    context = {"outstanding": outstanding}
+    if request.GET.get("stream") == "1":
+        return stream_table(
+            request, "billing/order_list.html", context, "billing/_order_row.html",
+            orders.order_by("-date", "-pk"), "o",
+        )
+    context["orders"] = keyset_paginate(request, orders, "-date")
+    return render(request, "billing/order_list.html", context)
 
 def order_detail(request, pk):
     order = get_object_or_404(Order.objects.select_related("customer"), pk=pk)
@@ -56,11 +80,7 @@ def order_detail(request, pk):
         {"order": order, "items": items, "payments": payments},
     )
 
-@transaction.atomic
 def order_create(request):
-    products = Product.objects.all()
-    customers = Customer.objects.all()
-
     if request.method == "POST":
         try:
             customer_id = int(request.POST.get("customer"))
@@ -73,60 +93,43 @@ def order_create(request):
         discount = Decimal(request.POST.get("discount") or 0)
         payment_status = request.POST.get("payment_status") or "unpaid"
 
-        order = Order.objects.create(
-            customer=customer,
-            created_by=request.user if request.user.is_authenticated else None,
-            date=now(),
-            tax=tax,
-            discount=discount,
-            payment_status=payment_status,
-        )
-
-        subtotal = Decimal("0.00")
-        any_item = False
-
-        for product in products:
-            qty_raw = request.POST.get(f"product_{product.id}")
-            if not qty_raw:
-                continue
-            try:
-                qty = int(qty_raw)
-            except ValueError:
-                qty = 0
-
-            if qty > 0:
-                any_item = True
-                if product.quantity < qty:
-                    messages.error(request, f"Not enough stock for {product.name}.")
-                    raise transaction.TransactionManagementError("Insufficient stock")
-
-                unit_price = product.price
-                line_total = (unit_price * qty).quantize(Decimal("0.01"))
-                subtotal += line_total
-
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    unit_price=unit_price,
-                    quantity=qty,
-                    line_total=line_total,
-                )
-
-                product.quantity -= qty
-                product.save(update_fields=["quantity"])
-
-        if not any_item:
-            messages.error(request, "Add at least one product quantity.")
-            raise transaction.TransactionManagementError("No items")
-
-        order.subtotal = subtotal
-        order.total = (subtotal + tax - discount).quantize(Decimal("0.01"))
-        order.save()
+        try:
+            order = place_order(
+                customer,
+                parse_order_lines(request.POST),
+                tax=tax,
+                discount=discount,
+                payment_status=payment_status,
+                created_by=request.user if request.user.is_authenticated else None,
+                date=now(),
+            )
+        except OrderError as exc:
+            messages.error(request, str(exc))
+            return redirect("billing:order_create")
 
         messages.success(request, f"Order created: {order.invoice_number}")
         return redirect("billing:order_detail", pk=order.pk)
 
-    return render(request, "billing/order_create.html", {"products": products, "customers": customers})
+    # products and customers are picked through the JSON lookups below
+    return render(request, "billing/order_create.html")
+
+
+# ---------- Order entry pickers (JSON) ----------
+def _picker_limit(request):
+    try:
+        return max(1, min(int(request.GET.get("limit", pickers.LIMIT)), pickers.MAX_LIMIT))
+    except ValueError:
+        return pickers.LIMIT
+
+
+@use_replica
+def product_lookup(request):
+    return JsonResponse({"results": pickers.products(request.GET.get("q", ""), _picker_limit(request))})
+
+
+@use_replica
+def customer_lookup(request):
+    return JsonResponse({"results": pickers.customers(request.GET.get("q", ""), _picker_limit(request))})
 
 # ---------- Payments ----------
 def add_payment(request, pk):
@@ -136,9 +139,7 @@ def add_payment(request, pk):
         if form.is_valid():
             payment = form.save(commit=False)
             payment.order = order
-            payment.save()
-            order.refresh_totals()
-            order.save(update_fields=["subtotal", "total", "payment_status"])
+            payment.save()  # billing.signals updates amount_paid, balance and payment_status
             messages.success(request, "Payment recorded.")
             return redirect("billing:order_detail", pk=order.pk)
         messages.error(request, "Please fix errors below.")
@@ -148,43 +149,143 @@ def add_payment(request, pk):
 
 # ---------- Invoice (HTML / PDF) ----------
 def invoice_view(request, pk):
-    order = get_object_or_404(Order, pk=pk)
-    context = {
-        "order": order,
-        "company_name": "Ittefaq Auto Tractor Spare Parts",
-        "company_address": "Main Market, Lahore, Pakistan",
-        "company_phone": "+92 300 1234567",
-        "company_email": "info@ittefaqtractors.com",
-        "logo_url": request.build_absolute_uri("/static/images/tractor_logo.png")
-    }
-    return render(request, "billing/invoice_template.html", context)
+    invoice = invoices.load_invoice(pk)
+    return render(request, invoices.TEMPLATE_NAME, invoice.context(invoices.company_context(request)))
 
 def invoice_pdf(request, pk):
-    try:
-        from weasyprint import HTML
-    except Exception:
-        messages.error(request, "WeasyPrint not installed. Install it to generate PDF.")
-        return redirect("billing:invoice_view", pk=pk)
+    invoice = invoices.load_invoice(pk)
+    order = invoice.order
+    digest = invoice.digest
+    path = invoices.cached_path(order.pk, digest)
+    etag = f'"{digest}"'
 
-    order = get_object_or_404(Order, pk=pk)
-    from django.template.loader import render_to_string
-    html_string = render_to_string(
-        "billing/invoice_template.html",
-        {
-            "order": order,
-            "company_name": "Ittefaq Auto Tractor Spare Parts",
-            "company_address": "Main Market, Lahore, Pakistan",
-            "company_phone": "+92 300 1234567",
-            "company_email": "info@ittefaqtractors.com",
-            "logo_url": request.build_absolute_uri("/static/images/tractor_logo.png")
-        }
-    )
-
-    base_url = str(settings.BASE_DIR)  # FIX for WindowsPath
-    pdf = HTML(string=html_string, base_url=base_url).write_pdf()
+    if os.path.exists(path):
+        last_modified = int(os.path.getmtime(path))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(open(path, "rb"), content_type="application/pdf")
+    else:
+        try:
+            pdf = invoices.render_pdf(invoice.context(invoices.company_context(request)))
+        except (ImportError, OSError):
+            messages.error(request, "WeasyPrint not installed. Install it to generate PDF.")
+            return redirect("billing:invoice_view", pk=pk)
+        invoices.store(order.pk, digest, pdf)
+        last_modified = int(os.path.getmtime(path))
+        response = HttpResponse(pdf, content_type="application/pdf")
 
-    from django.http import HttpResponse
     filename = f"invoice_{order.invoice_number}.pdf"
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    if response.status_code == 200:
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
     return response
+
+
+# ---------- Reports (JSON, from the sales rollups) ----------
+REPORT_DEFAULT_DAYS = 30
+REPORT_LIMIT = 100
+
+
+def _report_range(request):
+    """``?from=YYYY-MM-DD&to=YYYY-MM-DD``, defaulting to the last 30 days."""
+    end = date.fromisoformat(request.GET["to"]) if request.GET.get("to") else localdate()
+    start = (
+        date.fromisoformat(request.GET["from"]) if request.GET.get("from")
+        else end - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    )
+    if start > end:
+        raise ValueError("'from' is after 'to'.")
+    return start, end
+
+
+def _report(request, build):
+    try:
+        start, end = _report_range(request)
+    except ValueError as exc:
+        return JsonResponse({"error": f"Invalid date range: {exc}"}, status=400)
+    return JsonResponse({"from": start, "to": end, **build(start, end)})
+
+
+@use_replica
+def report_revenue(request):
+    return _report(request, lambda start, end: {
+        "totals": reports.totals(start, end), "days": reports.revenue_by_day(start, end),
+    })
+
+
+@use_replica
+def report_top_products(request):
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), REPORT_LIMIT))
+    except ValueError:
+        limit = 10
+    order_by = "quantity" if request.GET.get("by") == "quantity" else "revenue"
+    return _report(request, lambda start, end: {
+        "products": reports.top_products(start, end, limit=limit, order_by=order_by),
+    })
+
+
+@use_replica
+def report_categories(request):
+    return _report(request, lambda start, end: {"categories": reports.sales_by_category(start, end)})
+
+
+@use_replica
+def report_payments(request):
+    return _report(request, lambda start, end: {"methods": reports.payments_by_method(start, end)})
+
+
+# ---------- Receivables (AR aging, customer statements) ----------
+STATEMENT_PAGE_SIZE = 50
+
+
+@use_replica
+def ar_aging(request):
+    page = keyset_paginate(request, receivables.customers_with_balance(), "name")
+    receivables.attach_aging(page.object_list)
+    # the totals pass over every open order, so only the first page shows them
+    totals = None if page.has_previous else receivables.aging_totals()
+    return render(request, "billing/ar_aging.html", {"customers": page, "totals": totals})
+
+
+@use_replica
+def ar_aging_export(request):
+    return exports.respond(request, receivables.AgingExport())
+
+
+@use_replica
+def customer_statement(request, pk):
+    customer = get_object_or_404(Customer, pk=pk)
+    paginator = Paginator(receivables.Statement(customer.pk), STATEMENT_PAGE_SIZE)
+    # oldest line first, so open on the last page with the latest activity
+    page = paginator.get_page(request.GET.get("page") or paginator.num_pages)
+    return render(request, "billing/customer_statement.html", {
+        "customer": customer, "lines": page, "summary": receivables.customer_summary(customer.pk),
+    })
+
+
+@use_replica
+def customer_statement_export(request, pk):
+    customer = get_object_or_404(Customer, pk=pk)
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("Unknown export format.")
+    return exports.response(receivables.Statement(customer.pk), fmt=fmt)
+
+
+# ---------- Exports (CSV / XLSX, streamed) ----------
+@use_replica
+def order_export(request):
+    return exports.respond(request, exports.ORDERS)
+
+
+@use_replica
+def customer_export(request):
+    return exports.respond(request, exports.CUSTOMERS)
+
+
+@use_replica
+def payment_export(request):
+    return exports.respond(request, exports.PAYMENTS)
@@ -1,5 +1,19 @@
-from django.contrib import admin
-from .models import Category, Product
+import json
+import re
+
+from django.contrib import admin, messages
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.utils import model_ngettext
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms import BaseModelFormSet, ModelChoiceField
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+from django.utils.translation import ngettext
+
+from . import dashboard, exports, ledger, scan, search
+from .models import Barcode, Category, Product, StockTransaction
+from .pagination import EstimatedCountPaginator
 
 # Category Admin
 @admin.register(Category)
@@ -8,14 +22,154 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+# Hidden row id of a changelist form, answered from the row the formset already
+# fetched for it (form.instance) instead of with one SELECT per row
+class ExistingRowField(ModelChoiceField):
+    def __init__(self, form, *args, **kwargs):
+        self.form = form
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        instance = self.form.instance
+        try:
+            pk = self.queryset.model._meta.pk.to_python(value)
+        except ValidationError:
+            pk = None
+        if pk is None or instance.pk != pk:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return instance
+
+
+class ChangelistFormSet(BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self.model._meta.pk.name
+        field = form.fields[name]
+        form.fields[name] = ExistingRowField(
+            form, field.queryset, initial=field.initial, required=False, widget=field.widget,
+        )
+
+
+# Extra scannable codes, edited on the product page
+class BarcodeInline(admin.TabularInline):
+    model = Barcode
+    extra = 1
+
+
 # Product Admin
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'quantity', 'minimum_stock', 'price')
+    list_display = ('name', 'sku', 'category', 'quantity', 'minimum_stock', 'price')
     list_filter = ('category',)
-    search_fields = ('name', 'category__name')
+    search_fields = ('name', '=sku', 'category__name')
     list_editable = ('quantity', 'minimum_stock', 'price')  # inline edit in list view
     ordering = ('name',)
+    actions = exports.admin_actions(exports.PRODUCTS)
+    inlines = [BarcodeInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # str(product) names the category: changelist rows, list_editable log entries
+        return super().get_queryset(request).select_related('category')
+
+    def get_changelist_formset(self, request, **kwargs):
+        return super().get_changelist_formset(request, formset=ChangelistFormSet, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # the full-text index instead of icontains scans over name and category
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return search.filter_products(queryset, term) | queryset.filter(sku__iexact=term), False
+
+    def save_model(self, request, obj, form, change):
+        # admin wraps change form and list_editable saves in a transaction
+        super().save_model(request, obj, form, change)
+        ledger.record_form_change(form, notes=f'Admin edit by {request.user}')
+
+    def changelist_view(self, request, extra_context=None):
+        # list_editable "Save": one bulk UPDATE for the page instead of a save() per row
+        if request.method == 'POST' and '_save' in request.POST and self.has_change_permission(request):
+            FormSet = self.get_changelist_formset(request)
+            queryset = self.posted_rows(request, FormSet.get_default_prefix())
+            formset = FormSet(request.POST, request.FILES, queryset=queryset)
+            if formset.is_valid():
+                changed = [form for form in formset.forms if form.has_changed()]
+                if changed:
+                    self.save_changelist_forms(request, changed)
+                    self.message_user(request, ngettext(
+                        '%(count)s %(name)s was changed successfully.',
+                        '%(count)s %(name)s were changed successfully.',
+                        len(changed),
+                    ) % {'count': len(changed), 'name': model_ngettext(self.opts, len(changed))}, messages.SUCCESS)
+                return HttpResponseRedirect(request.get_full_path())
+            # invalid: the stock view re-validates and shows the errors
+        return super().changelist_view(request, extra_context)
+
+    def posted_rows(self, request, prefix):
+        """The products whose ids the list_editable POST carries, fetched in one query."""
+        pattern = re.compile(rf'{re.escape(prefix)}-\d+-{self.opts.pk.name}')
+        pks = []
+        for key, value in request.POST.items():
+            if pattern.fullmatch(key):
+                try:
+                    pks.append(self.opts.pk.to_python(value))
+                except ValidationError:
+                    pass  # the row's form reports it
+        return self.get_queryset(request).filter(pk__in=pks)
+
+    @transaction.atomic
+    def save_changelist_forms(self, request, forms):
+        """
+        Write the changed list_editable rows with one bulk_update, their stock
+        ledger rows with one insert and their admin log entries with one
+        insert per distinct change message. bulk_update skips the model
+        signals, so the caches they would clear are cleared here.
+        """
+        now = timezone.now()
+        products = []
+        for form in forms:
+            product = self.save_form(request, form, change=True)
+            product.updated_at = now
+            products.append(product)
+        Product.objects.bulk_update(products, [*self.list_editable, 'updated_at'])
+        ledger.record_form_changes(forms, notes=f'Admin edit by {request.user}')
+
+        by_message = {}
+        for form in forms:
+            message = json.dumps(self.construct_change_message(request, form, None))
+            by_message.setdefault(message, []).append(form.instance)
+        for message, objects in by_message.items():
+            LogEntry.objects.log_actions(request.user.pk, objects, CHANGE, message)
+
+        dashboard.invalidate()
+        scan.forget(*(product.pk for product in products))
+
+
+# Stock ledger is append-only; rows come from inventory.ledger
+@admin.register(StockTransaction)
+class StockTransactionAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'transaction_type', 'quantity', 'notes')
+    list_filter = ('transaction_type',)
+    list_select_related = ('product__category',)
+    raw_id_fields = ('product',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'date'
+    actions = exports.admin_actions(exports.STOCK_TRANSACTIONS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # append-only: the ledger sum must stay equal to Product.quantity
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 
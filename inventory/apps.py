@@ -1,6 +1,40 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, pre_migrate
+
+
+def drop_search_triggers(sender, using, **kwargs):
+    from . import search
+
+    search.drop_triggers(using)
+
+
+def install_search_index(sender, using, **kwargs):
+    from . import search
+
+    search.install(using)
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        pre_migrate.connect(drop_search_triggers, sender=self)
+        post_migrate.connect(install_search_index, sender=self)
+
+        from . import db
+
+        connection_created.connect(db.configure_connection)
+
+        from . import dashboard
+
+        dashboard.connect_signals()
+
+        from . import scan
+
+        scan.connect_signals()
+
+        from . import thumbnails
+
+        thumbnails.connect_signals()
@@ -0,0 +1,59 @@
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import Product
+
+CACHE_KEY = "dashboard:metrics:{day}"
+# safety net for writes that bypass model signals (queryset.update, raw SQL)
+CACHE_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)
+
+ZERO = Value(Decimal("0.00"))
+
+
+def _cache_key():
+    return CACHE_KEY.format(day=timezone.localdate().isoformat())
+
+
+def compute_metrics():
+    from billing.models import Customer, Order
+
+    stock = Product.objects.aggregate(
+        product_count=Count("pk"),
+        low_stock_count=Count("pk", filter=Q(quantity__lte=F("minimum_stock"))),
+        stock_value=Coalesce(
+            Sum(ExpressionWrapper(F("price") * F("quantity"), output_field=DecimalField())), ZERO
+        ),
+    )
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    orders = Order.objects.aggregate(
+        order_count=Count("pk"),
+        revenue_today=Coalesce(Sum("total", filter=Q(date__gte=start_of_day)), ZERO),
+        receivables=Coalesce(Sum("balance", filter=Q(balance__gt=0)), ZERO),
+    )
+    return {**stock, **orders, "customer_count": Customer.objects.count()}
+
+
+def get_metrics():
+    key = _cache_key()
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = compute_metrics()
+        cache.set(key, metrics, CACHE_TIMEOUT)
+    return metrics
+
+
+def invalidate(**kwargs):
+    cache.delete(_cache_key())
+
+
+def connect_signals():
+    for sender in (Product, "billing.Customer", "billing.Order", "billing.Payment"):
+        post_save.connect(invalidate, sender=sender, dispatch_uid=f"dashboard-save-{sender}")
+        post_delete.connect(invalidate, sender=sender, dispatch_uid=f"dashboard-delete-{sender}")
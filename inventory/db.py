@@ -0,0 +1,46 @@
+"""
+SQLite connection tuning.
+
+configure_connection() runs on ``connection_created`` and applies the
+SQLITE_PRAGMAS setting (merged over PRAGMAS below) to every new SQLite
+connection: WAL so readers never wait for a writer, synchronous=NORMAL (safe
+in WAL; only the last commits can be lost on power failure, never
+corrupted), a busy timeout so writers queue instead of failing with
+"database is locked", and a memory map plus a larger page cache for reads.
+Connection reuse itself is DATABASES' CONN_MAX_AGE.
+"""
+from django.conf import settings
+
+PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,  # ms
+    "cache_size": -64000,  # negative = KiB, so 64 MB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
+
+def pragmas():
+    """The effective pragmas; a None value in SQLITE_PRAGMAS drops a default."""
+    merged = {**PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+    return {name: value for name, value in merged.items() if value is not None}
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def current_pragmas(connection):
+    """``{name: value}`` as SQLite reports them for ``connection``."""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in pragmas():
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+        return values
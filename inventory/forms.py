@@ -6,4 +6,14 @@ from .models import Product
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ['name', 'category', 'description', 'quantity', 'price', 'image', 'minimum_stock']
+        fields = ['name', 'sku', 'category', 'description', 'quantity', 'price', 'image', 'minimum_stock']
+
+
+class StockInForm(forms.Form):
+    quantity = forms.IntegerField(min_value=1)
+    notes = forms.CharField(required=False, widget=forms.Textarea(attrs={'rows': 2}))
+
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV, JSON array or JSON Lines. Rows with an "id", or the "sku" of an existing product, update that product.')
+    create_categories = forms.BooleanField(required=False, initial=True, label='Create missing categories')
@@ -0,0 +1,371 @@
+"""
+Bulk product import from CSV or JSON.
+
+The file is read as a stream and handled ``batch_size`` rows at a time: rows
+are validated in Python, category names are resolved through an in-memory
+name -> id map (missing categories are created in bulk), and each batch is
+written in its own transaction with one upsert for rows that carry an id
+(or the SKU of an existing product) and one insert for new rows, plus the
+matching stock ledger rows. Rows that
+fail validation go to a CSV error file with their line number and the
+reason; the rest of the batch still loads.
+"""
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import dashboard, ledger, scan
+from .exports import FORMULA_PREFIXES, cell
+from .models import Category, Product
+
+BATCH_SIZE = 2000
+
+# headers are matched case-insensitively with spaces as underscores, so the
+# column names of inventory.exports.PRODUCTS ("ID", "Minimum stock") work too
+COLUMNS = ("id", "sku", "name", "category", "price", "quantity", "minimum_stock", "description")
+REQUIRED = {"name", "category", "price"}
+UPDATABLE = ["sku", "name", "category", "description", "price", "quantity", "minimum_stock"]
+
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+SKU_MAX_LENGTH = Product._meta.get_field("sku").max_length
+CATEGORY_MAX_LENGTH = Category._meta.get_field("name").max_length
+PRICE_FIELD = Product._meta.get_field("price")
+PRICE_LIMIT = Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)
+CENT = Decimal(1).scaleb(-PRICE_FIELD.decimal_places)
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def normalise_header(name):
+    name = (name or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return name if name in COLUMNS else None
+
+
+# ---------- Readers: yield (line_number, {field: raw value}) ----------
+def read_csv(stream):
+    reader = csv.reader(stream)
+    try:
+        header = [normalise_header(h) for h in next(reader)]
+    except StopIteration:
+        return
+    missing = REQUIRED - set(header)
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(sorted(missing))}.")
+    for values in reader:
+        if not any(values):
+            continue
+        yield reader.line_num, {field: value for field, value in zip(header, values) if field}
+
+
+def read_json(stream, chunk_size=64 * 1024):
+    """
+    Products from a JSON array or from JSON Lines, decoded one object at a
+    time so the whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, index, started = "", 0, 0, False
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,\ufeff":
+                position += 1
+            if not started and position < len(buffer):
+                started = True
+                if buffer[position] == "[":
+                    position += 1
+                    continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    if buffer[position:].strip():
+                        raise ImportFormatError(f"Invalid JSON near object {index + 1}.")
+                    return
+                break
+            position = end
+            index += 1
+            if not isinstance(obj, dict):
+                raise ImportFormatError(f"Object {index} is not a JSON object.")
+            yield index, {normalise_header(k): v for k, v in obj.items() if normalise_header(k)}
+
+
+def reader_for(stream, fmt):
+    if fmt == "json":
+        return read_json(stream)
+    if fmt == "csv":
+        return read_csv(stream)
+    raise ImportFormatError(f"Unknown import format: {fmt}")
+
+
+def format_from_name(filename):
+    return "json" if filename.lower().endswith((".json", ".jsonl", ".ndjson")) else "csv"
+
+
+def text_stream(binary):
+    """Wrap an uploaded or opened binary file for the readers (strips a UTF-8 BOM)."""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+# ---------- Validation ----------
+def _text(raw):
+    text = "" if raw is None else str(raw).strip()
+    # undo the quote inventory.exports.cell() puts before formula-like text
+    if text[:1] == "'" and text[1:].startswith(FORMULA_PREFIXES):
+        text = text[1:]
+    return text
+
+
+def _count(raw, label):
+    text = _text(raw)
+    if not text:
+        return 0
+    try:
+        value = int(Decimal(text))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{label} must be a whole number.")
+    if value < 0 or value != Decimal(text):
+        raise ValueError(f"{label} must be a whole number of 0 or more.")
+    return value
+
+
+def clean_row(raw):
+    """Return a dict of Product values or raise ValueError with the reason."""
+    row = {}
+    if _text(raw.get("id")):
+        try:
+            row["id"] = int(_text(raw["id"]))
+        except ValueError:
+            raise ValueError("id must be a number.")
+    if "sku" in raw:
+        sku = _text(raw["sku"])
+        if len(sku) > SKU_MAX_LENGTH:
+            raise ValueError(f"sku is longer than {SKU_MAX_LENGTH} characters.")
+        row["sku"] = sku or None
+    name = _text(raw.get("name"))
+    if not name:
+        raise ValueError("name is required.")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError(f"name is longer than {NAME_MAX_LENGTH} characters.")
+    row["name"] = name
+    category = _text(raw.get("category"))
+    if not category:
+        raise ValueError("category is required.")
+    if len(category) > CATEGORY_MAX_LENGTH:
+        raise ValueError(f"category is longer than {CATEGORY_MAX_LENGTH} characters.")
+    row["category"] = category
+    try:
+        price = Decimal(_text(raw.get("price")))
+    except InvalidOperation:
+        raise ValueError("price must be a number.")
+    if not price.is_finite() or price < 0 or price >= PRICE_LIMIT:
+        raise ValueError(f"price must be between 0 and {PRICE_LIMIT}.")
+    row["price"] = price.quantize(CENT)
+    if "quantity" in raw:
+        row["quantity"] = _count(raw["quantity"], "quantity")
+    if "minimum_stock" in raw:
+        row["minimum_stock"] = _count(raw["minimum_stock"], "minimum_stock")
+    if "description" in raw:
+        row["description"] = _text(raw["description"]) or None
+    return row
+
+
+# ---------- Loading ----------
+class ImportResult:
+    def __init__(self):
+        self.rows = self.created = self.updated = self.failed = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows: {self.created} created, {self.updated} updated, {self.failed} failed "
+            f"in {self.seconds:.1f}s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+class ErrorWriter:
+    """Per-row error CSV, created on the first error."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = self._writer = None
+        self.count = 0
+
+    def write(self, line, raw, message):
+        if self.path is None:
+            return
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["line", "error", *COLUMNS])
+        self._writer.writerow([line, message, *(cell(raw.get(field, "")) for field in COLUMNS)])
+        self.count += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def _batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _category_map():
+    return {name.lower(): pk for name, pk in Category.objects.values_list("name", "pk")}
+
+
+def _category_ids(names, categories, create):
+    missing = {name for name in names if name.lower() not in categories}
+    if missing and create:
+        Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+        categories.update(
+            (name.lower(), pk) for name, pk in Category.objects.filter(name__in=missing).values_list("name", "pk")
+        )
+    return categories
+
+
+@transaction.atomic
+def _load_batch(rows, categories, create_categories):
+    """
+    Write one batch of cleaned ``(line, raw, row)`` tuples in a single
+    transaction. Returns ``(created, updated, rejected)`` where ``rejected``
+    lists ``(line, raw, reason)``.
+    """
+    _category_ids({row["category"] for _, _, row in rows}, categories, create_categories)
+    # a row without an id updates the product that already has its SKU
+    skus = {row["sku"] for _, _, row in rows if "id" not in row and row.get("sku")}
+    known = dict(Product.objects.filter(sku__in=skus).values_list("sku", "pk")) if skus else {}
+
+    keyed, new, present, rejected = {}, [], {}, []
+    for line, raw, row in rows:
+        category_id = categories.get(row["category"].lower())
+        if category_id is None:
+            rejected.append((line, raw, f"Unknown category {row['category']!r}."))
+            continue
+        if "id" not in row and row.get("sku") in known:
+            row["id"] = known[row["sku"]]
+        product = Product(category_id=category_id, **{k: v for k, v in row.items() if k != "category"})
+        if "id" in row:
+            keyed[row["id"]] = product  # a repeated id in one batch: the last row wins
+            present[row["id"]] = frozenset(row)
+        else:
+            new.append(product)
+
+    previous = {
+        pk: (quantity, category_id, name)
+        for pk, quantity, category_id, name in Product.objects.filter(pk__in=keyed).values_list(
+            "pk", "quantity", "category_id", "name"
+        )
+    }
+    # only overwrite the columns a row actually supplied; one upsert per distinct column set
+    groups = {}
+    for pk, product in keyed.items():
+        groups.setdefault(present[pk], []).append(product)
+    for supplied, products in groups.items():
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=["pk"],
+            update_fields=[f for f in UPDATABLE if f in supplied] + ["updated_at"],
+        )
+    if new:
+        Product.objects.bulk_create(new)
+
+    changes = {}
+    for product in new:
+        changes[product.pk] = product.quantity
+    moved, renamed = [], []
+    for pk, product in keyed.items():
+        if pk in previous:
+            old_quantity, old_category, old_name = previous[pk]
+            if "quantity" in present[pk]:
+                changes[pk] = product.quantity - old_quantity
+            if old_category != product.category_id:
+                moved.append(product)
+            if old_name != product.name:
+                renamed.append(pk)
+        else:
+            changes[pk] = product.quantity
+    ledger.record(changes, notes="Catalog import")
+    if moved:
+        from billing.rollups import sync_product_category
+
+        for product in moved:
+            sync_product_category(product)
+    if renamed:
+        from billing.models import Order
+
+        # the upsert skips billing.signals: cached order and invoice fragments show the product name
+        Order.touch_for_products(*renamed)
+
+    return len(keyed) - len(previous) + len(new), len(previous), rejected
+
+
+def import_products(rows, batch_size=BATCH_SIZE, error_path=None, create_categories=True, progress=None):
+    """
+    Load ``(line, raw_dict)`` pairs from one of the readers. Returns an
+    ImportResult; ``progress(result)`` is called after every batch.
+    """
+    result = ImportResult()
+    errors = ErrorWriter(error_path)
+    categories = _category_map()
+    started = time.perf_counter()
+    try:
+        for batch in _batches(rows, batch_size):
+            cleaned = []
+            for line, raw in batch:
+                result.rows += 1
+                try:
+                    row = clean_row(raw)
+                except ValueError as exc:
+                    errors.write(line, raw, str(exc))
+                    result.failed += 1
+                    continue
+                cleaned.append((line, raw, row))
+            if cleaned:
+                try:
+                    created, updated, rejected = _load_batch(cleaned, categories, create_categories)
+                except DatabaseError as exc:
+                    # the batch was rolled back as a whole; report every row in it
+                    created, updated = 0, 0
+                    rejected = [(line, raw, f"Batch not loaded: {exc}") for line, raw, _ in cleaned]
+                    categories = _category_map()  # categories created by the batch were rolled back too
+                for line, raw, reason in rejected:
+                    errors.write(line, raw, reason)
+                result.created += created
+                result.updated += updated
+                result.failed += len(rejected)
+            result.seconds = time.perf_counter() - started
+            if progress:
+                progress(result)
+    finally:
+        errors.close()
+        result.seconds = time.perf_counter() - started
+        dashboard.invalidate()
+        scan.clear()  # the upserts bypass the model signals
+    return result
+
+
+def error_file_name():
+    return f"product-import-errors-{timezone.now():%Y%m%d-%H%M%S-%f}.csv"
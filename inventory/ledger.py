@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import dashboard, scan
+from .models import Product, StockSnapshot, StockTransaction
+
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+def record(changes, notes=None):
+    """
+    Append one StockTransaction per non-zero ``{product_id: delta}`` entry with
+    a single bulk_create. Callers apply the quantity change themselves, inside
+    the same transaction.
+    """
+    rows = [
+        StockTransaction(
+            product_id=product_id,
+            transaction_type="IN" if delta > 0 else "OUT",
+            quantity=abs(delta),
+            notes=notes,
+        )
+        for product_id, delta in changes.items()
+        if delta
+    ]
+    return StockTransaction.objects.bulk_create(rows)
+
+
+def record_form_change(form, notes=None):
+    """Log the quantity edit made through a Product ModelForm that was just saved."""
+    return record_form_changes([form], notes=notes)
+
+
+def record_form_changes(forms, notes=None):
+    """record_form_change() for several saved forms, with one insert."""
+    return record({
+        form.instance.pk: form.instance.quantity - (form.initial.get("quantity") or 0)
+        for form in forms
+        if "quantity" in form.changed_data
+    }, notes=notes)
+
+
+@transaction.atomic
+def stock_in(product, quantity, notes=None):
+    Product.objects.filter(pk=product.pk).update(quantity=F("quantity") + quantity, updated_at=timezone.now())
+    record({product.pk: quantity}, notes=notes or "Stock in")
+    # the queryset update fires no post_save
+    dashboard.invalidate()
+    scan.forget(product.pk)
+    product.refresh_from_db(fields=["quantity"])
+    return product
+
+
+@transaction.atomic
+def take_snapshot(taken_at=None):
+    """Store every product's current quantity; returns the number of rows written."""
+    taken_at = taken_at or timezone.now()
+    rows = (
+        StockSnapshot(product_id=pk, taken_at=taken_at, quantity=qty)
+        for pk, qty in Product.objects.values_list("pk", "quantity").iterator(chunk_size=SNAPSHOT_BATCH_SIZE)
+    )
+    return len(StockSnapshot.objects.bulk_create(rows, batch_size=SNAPSHOT_BATCH_SIZE))
+
+
+def stock_as_of(product, when):
+    """
+    Quantity of ``product`` at ``when``: the latest snapshot at or before
+    ``when`` plus the ledger entries after it, so only the tail since the last
+    snapshot is summed.
+    """
+    product_id = getattr(product, "pk", product)
+    snapshot = (
+        StockSnapshot.objects.filter(product_id=product_id, taken_at__lte=when)
+        .order_by("-taken_at")
+        .values_list("taken_at", "quantity")
+        .first()
+    )
+    entries = StockTransaction.objects.filter(product_id=product_id, date__lte=when)
+    base = 0
+    if snapshot:
+        entries = entries.filter(date__gt=snapshot[0])
+        base = snapshot[1]
+    totals = entries.aggregate(
+        stock_in=Sum("quantity", filter=Q(transaction_type="IN")),
+        stock_out=Sum("quantity", filter=Q(transaction_type="OUT")),
+    )
+    return base + (totals["stock_in"] or 0) - (totals["stock_out"] or 0)
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory import thumbnails
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the WebP/JPEG variants of existing product images (inventory.thumbnails.VARIANTS). "
+        "Images whose variants all exist are skipped unless --force is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate variants that already exist.")
+        parser.add_argument("--workers", type=int, default=4, help="Images resized in parallel (default 4).")
+
+    def handle(self, *args, **opts):
+        names = list(
+            Product.objects.exclude(image="").exclude(image__isnull=True)
+            .order_by().values_list("image", flat=True).distinct()
+        )
+        written = failed = 0
+        with ThreadPoolExecutor(max_workers=max(opts["workers"], 1)) as pool:
+            futures = {name: pool.submit(thumbnails.generate, name, force=opts["force"]) for name in names}
+            for name, future in futures.items():
+                try:
+                    files = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc.__class__.__name__}: {exc}")
+                    continue
+                written += len(files)
+                if files:
+                    # cached list rows and detail fragments pick up the variants
+                    Product.objects.filter(image=name).update(updated_at=timezone.now())
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(names)} images: {written} variants written, {failed} failed."
+        ))
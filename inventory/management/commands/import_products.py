@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products from a CSV or JSON (array or JSON Lines) file. Rows with an id "
+        "update that product; rows without one are created. Invalid rows go to an error CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "json"], help="Default: from the file extension.")
+        parser.add_argument("--batch-size", type=int, default=imports.BATCH_SIZE)
+        parser.add_argument("--errors", help="Error CSV path (default: <path>.errors.csv).")
+        parser.add_argument("--no-create-categories", action="store_true",
+                            help="Reject rows whose category does not exist instead of creating it.")
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        error_path = opts["errors"] or f"{path}.errors.csv"
+        fmt = opts["format"] or imports.format_from_name(path)
+
+        def progress(result):
+            self.stdout.write(f"  {result}")
+
+        with open(path, "rb") as fh:
+            try:
+                result = imports.import_products(
+                    imports.reader_for(imports.text_stream(fh), fmt),
+                    batch_size=opts["batch_size"],
+                    error_path=error_path,
+                    create_categories=not opts["no_create_categories"],
+                    progress=progress if opts["verbosity"] > 1 else None,
+                )
+            except imports.ImportFormatError as exc:
+                raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {result}."))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f"Row errors written to {error_path}"))
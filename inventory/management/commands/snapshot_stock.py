@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory import ledger
+
+
+class Command(BaseCommand):
+    help = "Record a stock snapshot for every product (run periodically, e.g. nightly)."
+
+    def handle(self, *args, **opts):
+        count = ledger.take_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"Snapshot stored for {count} products."))
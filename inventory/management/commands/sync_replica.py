@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import routing
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the 'replica' alias's file with the online backup API. "
+        "A local stand-in for replication; with --interval it keeps copying until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Seconds between copies (default: copy once).")
+
+    def handle(self, *args, **opts):
+        alias = routing.replica_alias()
+        if alias is None:
+            raise CommandError("No 'replica' database is configured; set DATABASE_REPLICA_PATH.")
+        primary, replica = settings.DATABASES["default"], settings.DATABASES[alias]
+        if "sqlite3" not in primary["ENGINE"] or "sqlite3" not in replica["ENGINE"]:
+            raise CommandError("sync_replica copies SQLite files; use the database's own replication otherwise.")
+
+        while True:
+            started = time.perf_counter()
+            routing.replicate(primary["NAME"], replica["NAME"])
+            self.stdout.write(f"Copied {primary['NAME']} -> {replica['NAME']} in {time.perf_counter() - started:.2f}s")
+            if not opts["interval"]:
+                return
+            time.sleep(opts["interval"])
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def baseline_snapshot(apps, schema_editor):
+    # Existing stock predates the ledger; anchor it so stock_as_of() starts from here.
+    Product = apps.get_model('inventory', 'Product')
+    StockSnapshot = apps.get_model('inventory', 'StockSnapshot')
+    taken_at = timezone.now()
+    StockSnapshot.objects.bulk_create(
+        (StockSnapshot(product_id=pk, taken_at=taken_at, quantity=qty)
+         for pk, qty in Product.objects.values_list('pk', 'quantity').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_product_low_stock_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['product', 'date'], name='inventory_stocktxn_prod_date'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'taken_at'), name='inventory_snapshot_prod_taken'),
+        ),
+        migrations.RunPython(baseline_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:24
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_product_sku_barcode'),
+    ]
+
+    operations = [
+        # this used to be created outside the migrations by a post_migrate hook in billing
+        migrations.RunSQL("DROP INDEX IF EXISTS inventory_product_sku_ci", migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.comparison.Collate('sku', 'NOCASE'), name='inventory_product_sku_ci'),
+        ),
+    ]
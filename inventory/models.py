@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Collate
 
 
 class Category(models.Model):
@@ -14,19 +16,47 @@ class Category(models.Model):
 class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="products")
     name = models.CharField(max_length=200)
+    # unique, so NULL for products that have not been given one yet
+    sku = models.CharField("SKU", max_length=64, unique=True, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField(default=0)
     minimum_stock = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to="product_images/", blank=True, null=True)
+    # version stamp for cached fragments; queryset updates set it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name"], name="inventory_product_name_idx"),
+            # partial index: only low-stock rows, ordered for the low-stock list
+            models.Index(
+                fields=["name"],
+                condition=Q(quantity__lte=F("minimum_stock")),
+                name="inventory_low_stock_idx",
+            ),
+            # SKU prefix matches in the product picker and scans (LIKE needs NOCASE on SQLite)
+            models.Index(Collate("sku", "NOCASE"), name="inventory_product_sku_ci"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.category.name})"
 
 
+class Barcode(models.Model):
+    """An extra scannable code (EAN/UPC, supplier code) for a product; its SKU scans as well."""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="barcodes")
+    code = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        ordering = ["code"]
+
+    def __str__(self):
+        return self.code
+
+
 class StockTransaction(models.Model):
     TRANSACTION_TYPES = [
         ("IN", "Stock In"),
@@ -41,7 +71,27 @@ class StockTransaction(models.Model):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["product", "date"], name="inventory_stocktxn_prod_date"),
+        ]
 
     def __str__(self):
         return f"{self.get_transaction_type_display()} - {self.product.name} ({self.quantity})"
 
+
+class StockSnapshot(models.Model):
+    """Product.quantity at a point in time; anchors inventory.ledger.stock_as_of."""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="snapshots")
+    taken_at = models.DateTimeField()
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["-taken_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "taken_at"], name="inventory_snapshot_prod_taken"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.quantity}"
+
@@ -0,0 +1,184 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.functional import cached_property
+
+PAGE_SIZE = 50
+STREAM_CHUNK_SIZE = 500
+ROWS_MARKER = "<!--rows-->"
+# below this many rows an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 10000
+
+
+def encode_cursor(value, pk, position):
+    raw = json.dumps([value, pk, position], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, field):
+    """Return (value, pk, position) or None if the cursor is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk, position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return field.to_python(value), int(pk), int(position)
+    except Exception:
+        return None
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, iterable like a list."""
+
+    def __init__(self, object_list, start_index, next_cursor, prev_cursor, params):
+        self.object_list = object_list
+        self.start_index = start_index
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _url(self, key, cursor):
+        params = self._params.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params[key] = cursor
+        return "?" + params.urlencode()
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_url(self):
+        return self._url("after", self.next_cursor) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url("before", self.prev_cursor) if self.has_previous else None
+
+
+def keyset_paginate(request, queryset, ordering, per_page=PAGE_SIZE):
+    """
+    Paginate ``queryset`` on ``ordering`` (e.g. ``"-date"`` or ``"name"``) with
+    ``pk`` as tie-breaker, using ``?after=`` / ``?before=`` cursors instead of
+    OFFSET so every page costs the same index range scan.
+    """
+    descending = ordering.startswith("-")
+    name = ordering.lstrip("-")
+    field = queryset.model._meta.get_field(name)
+    forward = (f"-{name}", "-pk") if descending else (name, "pk")
+    backward = (name, "pk") if descending else (f"-{name}", "-pk")
+    later, earlier = ("lt", "gt") if descending else ("gt", "lt")
+
+    after = decode_cursor(request.GET.get("after", ""), field)
+    before = None if after else decode_cursor(request.GET.get("before", ""), field)
+
+    if after:
+        value, pk, position = after
+        qs = queryset.filter(Q(**{f"{name}__{later}": value}) | Q(**{name: value, f"pk__{later}": pk}))
+        rows = list(qs.order_by(*forward)[:per_page + 1])
+        has_next, has_prev = len(rows) > per_page, True
+        rows = rows[:per_page]
+        start = position + 1
+    elif before:
+        value, pk, position = before
+        qs = queryset.filter(Q(**{f"{name}__{earlier}": value}) | Q(**{name: value, f"pk__{earlier}": pk}))
+        rows = list(qs.order_by(*backward)[:per_page + 1])
+        has_next, has_prev = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        start = max(position - len(rows), 1)
+    else:
+        rows = list(queryset.order_by(*forward)[:per_page + 1])
+        has_next, has_prev = len(rows) > per_page, False
+        rows = rows[:per_page]
+        start = 1
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, name), last.pk, start + len(rows) - 1)
+    if rows and has_prev:
+        first = rows[0]
+        prev_cursor = encode_cursor(getattr(first, name), first.pk, start)
+    return KeysetPage(rows, start, next_cursor, prev_cursor, request.GET)
+
+
+def stream_table(request, template_name, context, row_template, queryset, row_name,
+                 chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream a list page: the page template is rendered once with ``streaming``
+    set and split at ``ROWS_MARKER``; rows are rendered from
+    ``queryset.iterator()`` in chunks in between, so memory stays flat.
+    """
+    page = render_to_string(template_name, {**context, "streaming": True}, request)
+    head, tail = page.split(ROWS_MARKER, 1)
+    row = get_template(row_template)
+
+    def content():
+        yield head
+        chunk = []
+        for index, obj in enumerate(queryset.iterator(chunk_size=chunk_size), 1):
+            chunk.append(row.render({row_name: obj, "index": index}))
+            if len(chunk) >= chunk_size:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+        yield tail
+
+    return StreamingHttpResponse(content(), content_type="text/html; charset=utf-8")
+
+
+def estimated_row_count(model, using="default"):
+    """
+    Rows in ``model``'s table without counting them, or None where the
+    backend has no cheap estimate. SQLite: the highest rowid, one seek at the
+    end of the table (over-counts only deleted rows); PostgreSQL: the
+    planner's reltuples.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"SELECT max(rowid) FROM {connection.ops.quote_name(table)}")
+        elif connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of big tables. An unfiltered list takes
+    its count from estimated_row_count() once the table is past
+    ADMIN_ESTIMATE_COUNT_THRESHOLD rows instead of running COUNT(*) over all
+    of them; searches and filters still count exactly. Pair it with
+    ``show_full_result_count = False`` so a filtered page skips the second,
+    unfiltered count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            threshold = getattr(settings, "ADMIN_ESTIMATE_COUNT_THRESHOLD", ESTIMATE_THRESHOLD)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,216 @@
+"""
+Per-request SQL and latency profiling.
+
+QueryProfilingMiddleware wraps every database connection with
+``connection.execute_wrapper`` for the duration of a request and records
+query count, DB time, repeated query shapes (N+1 fingerprints) and wall
+time. Results go out as a ``Server-Timing`` header, into an in-process
+per-view histogram served by ``profiling_stats`` (staff only), and to the
+``inventory.profiling`` logger when a request crosses a threshold.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+
+logger = logging.getLogger("inventory.profiling")
+
+# defaults for the PROFILING_* settings
+SLOW_REQUEST_MS = 500
+SLOW_DB_MS = 200
+MAX_QUERIES = 50
+# the same query shape this many times in one request is reported as N+1
+DUPLICATE_QUERIES = 5
+
+
+def thresholds():
+    return {
+        "slow_request_ms": getattr(settings, "PROFILING_SLOW_REQUEST_MS", SLOW_REQUEST_MS),
+        "slow_db_ms": getattr(settings, "PROFILING_SLOW_DB_MS", SLOW_DB_MS),
+        "max_queries": getattr(settings, "PROFILING_MAX_QUERIES", MAX_QUERIES),
+        "duplicate_queries": getattr(settings, "PROFILING_DUPLICATE_QUERIES", DUPLICATE_QUERIES),
+    }
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Query shape: literals and IN-lists collapsed so N+1 loops share one key."""
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = _LITERALS.sub("?", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+class RequestProfile:
+    """Collects the queries of one request; installed as an execute wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.shapes[sql] += 1
+
+    def duplicates(self, threshold=DUPLICATE_QUERIES):
+        """``[(fingerprint, count), ...]`` for query shapes repeated ``threshold`` times or more."""
+        shapes = Counter()
+        for sql, count in self.shapes.items():
+            shapes[fingerprint(sql)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.n_plus_one = 0
+        self.slow = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.shapes = Counter()
+
+    def add(self, wall_ms, profile, duplicates, slow):
+        self.requests += 1
+        self.total_ms += wall_ms
+        self.max_ms = max(self.max_ms, wall_ms)
+        self.db_ms += profile.db_seconds * 1000
+        self.queries += profile.queries
+        self.max_queries = max(self.max_queries, profile.queries)
+        self.n_plus_one += bool(duplicates)
+        self.slow += slow
+        self.buckets[next(i for i, bound in enumerate(BUCKETS_MS) if wall_ms <= bound)] += 1
+        for shape, count in duplicates:
+            self.shapes[shape] += count
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile."""
+        wanted = fraction * self.requests
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return bound if bound != float("inf") else round(self.max_ms, 1)
+        return None
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "avg_ms": round(self.total_ms / self.requests, 1),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 1),
+            "avg_db_ms": round(self.db_ms / self.requests, 1),
+            "avg_queries": round(self.queries / self.requests, 1),
+            "max_queries": self.max_queries,
+            "n_plus_one_requests": self.n_plus_one,
+            "slow_requests": self.slow,
+            "histogram": {
+                ("inf" if bound == float("inf") else f"<={bound}ms"): count
+                for bound, count in zip(BUCKETS_MS, self.buckets)
+            },
+            "top_repeated_queries": self.shapes.most_common(3),
+        }
+
+
+class Registry:
+    """Per-view aggregates for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, wall_ms, profile, duplicates, slow):
+        with self._lock:
+            self._views.setdefault(view, ViewStats()).add(wall_ms, profile, duplicates, slow)
+
+    def snapshot(self):
+        with self._lock:
+            return {view: stats.as_dict() for view, stats in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PROFILING_ENABLED", True)
+        self.server_timing = getattr(settings, "PROFILING_SERVER_TIMING", settings.DEBUG)
+        self.thresholds = thresholds()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            # connection wrappers are per thread and cheap; no database is opened here
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        db_ms = profile.db_seconds * 1000
+
+        view = view_name(request)
+        limits = self.thresholds
+        duplicates = profile.duplicates(limits["duplicate_queries"])
+        slow = (
+            wall_ms >= limits["slow_request_ms"] or db_ms >= limits["slow_db_ms"]
+            or profile.queries >= limits["max_queries"]
+        )
+        registry.record(view, wall_ms, profile, duplicates, slow)
+
+        if slow or duplicates:
+            logger.warning(
+                "%s %s (%s): %.0f ms, %d queries in %.0f ms%s",
+                request.method, request.path, view, wall_ms, profile.queries, db_ms,
+                "".join(f"; repeated {count}x: {shape[:200]}" for shape, count in duplicates[:3]),
+            )
+        if self.server_timing:
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{profile.queries} queries", '
+                f"app;dur={max(wall_ms - db_ms, 0):.1f}, total;dur={wall_ms:.1f}"
+            )
+        return response
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Per-view latency histogram and query statistics; POST ``reset=1`` to clear."""
+    if request.method == "POST" and request.POST.get("reset"):
+        registry.reset()
+    return JsonResponse({"thresholds": thresholds(), "views": registry.snapshot()})
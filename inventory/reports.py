@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.db.models import F, FloatField, IntegerField, Q, Sum, Value
+from django.db.models.functions import Cast, Ceil, Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Product
+
+REORDER_WINDOW_DAYS = 30
+REORDER_COVER_DAYS = 14
+
+
+def low_stock_products(queryset=None):
+    """Products at or below their minimum; matches inventory_low_stock_idx."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.filter(quantity__lte=F("minimum_stock"))
+
+
+def reorder_report(window_days=REORDER_WINDOW_DAYS, cover_days=REORDER_COVER_DAYS):
+    """
+    Suggested reorder quantities from sales velocity, in one grouped query.
+
+    velocity  = units sold in the last ``window_days`` / ``window_days``
+    suggested = minimum_stock + ceil(velocity * cover_days) - quantity
+    """
+    from billing.models import OrderItem
+
+    since = timezone.now() - timedelta(days=window_days)
+    # only rows already short or with recent sales can need reordering
+    recently_sold = OrderItem.objects.filter(order__date__gte=since).values("product_id")
+    sold = Coalesce(Sum("orderitem__quantity", filter=Q(orderitem__order__date__gte=since)), Value(0))
+    demand = Cast(Ceil(Cast(F("sold"), FloatField()) * cover_days / window_days), IntegerField())
+    return (
+        Product.objects.select_related("category")
+        .filter(Q(quantity__lt=F("minimum_stock")) | Q(pk__in=recently_sold))
+        .annotate(sold=sold)
+        .annotate(suggested=Greatest(F("minimum_stock") + demand - F("quantity"), Value(0)))
+        .filter(suggested__gt=0)
+        .order_by("-suggested", "name")
+    )
@@ -0,0 +1,155 @@
+"""
+Primary / read-replica routing.
+
+Reads go to the ``replica`` alias only where a view or queryset opts in:
+views decorated with ``use_replica`` (including the body of a streamed
+response), blocks inside ``replica_reads()``, and querysets passed through
+``on_replica()``. Everything else, every write, and every read after the
+first write of a request stays on ``default``. ReplicaRoutingMiddleware
+scopes that per request and, after a write, sets a short-lived cookie so
+the follow-up requests of the same client (the redirect after a POST) read
+from primary until replication has caught up.
+
+Without a ``replica`` entry in DATABASES all of this routes to ``default``.
+replicate() is the local stand-in for replication: it copies one SQLite
+file into another with the online backup API (``manage.py sync_replica``).
+"""
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_primary"
+PIN_SECONDS = 5
+
+_reads = ContextVar("replica_reads", default=False)
+_pinned = ContextVar("primary_pinned", default=False)
+_wrote = ContextVar("primary_wrote", default=False)
+
+
+def replica_alias():
+    return REPLICA_ALIAS if REPLICA_ALIAS in settings.DATABASES else None
+
+
+def pin_to_primary():
+    """Send the rest of this request's reads to primary."""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+@contextmanager
+def _routing(reads, pinned=None):
+    tokens = [_reads.set(reads)]
+    if pinned is not None:
+        tokens.append(_pinned.set(pinned))
+    try:
+        yield
+    finally:
+        for var, token in zip((_reads, _pinned), tokens):
+            var.reset(token)
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """Fresh routing state for one request or job: nothing written yet."""
+    pinned_token, wrote_token = _pinned.set(pinned), _wrote.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+
+def replica_reads():
+    """Let reads inside the block use the replica (unless the request has written)."""
+    return _routing(True)
+
+
+def primary_reads():
+    """Keep reads inside the block on primary, e.g. a read-modify-write inside a replica view."""
+    return _routing(False)
+
+
+def on_replica(queryset):
+    """``queryset`` bound to the replica, for one-off reads outside a replica view."""
+    alias = replica_alias()
+    if alias is None or is_pinned():
+        return queryset
+    return queryset.using(alias)
+
+
+def _stream_in_context(content, pinned):
+    # a streamed body is produced after the view (and the middleware) returned
+    with _routing(True, pinned):
+        yield from content
+
+
+def use_replica(view):
+    """Route the view's reads, including a streamed response body, to the replica."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            response = view(request, *args, **kwargs)
+        if getattr(response, "streaming", False):
+            response.streaming_content = _stream_in_context(response.streaming_content, is_pinned())
+        return response
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def __init__(self, replica=None):
+        self.replica = replica
+
+    @property
+    def alias(self):
+        return self.replica or replica_alias()
+
+    def db_for_read(self, model, **hints):
+        if _reads.get() and not _pinned.get() and self.alias:
+            return self.alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # read-after-write: whatever this request reads next must see the write
+        _wrote.set(True)
+        pin_to_primary()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # the replica gets its schema through replication
+        return db != self.alias
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", PIN_SECONDS)
+
+    def __call__(self, request):
+        with request_scope(pinned=PIN_COOKIE in request.COOKIES):
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        if wrote and replica_alias() and self.pin_seconds:
+            response.set_cookie(PIN_COOKIE, "1", max_age=self.pin_seconds, httponly=True, samesite="Lax")
+        return response
+
+
+def replicate(source, target):
+    """Copy the SQLite database ``source`` into ``target`` page by page (online backup)."""
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
@@ -0,0 +1,138 @@
+"""
+Scan-to-cart lookups for the point of sale.
+
+resolve(code) turns a scanned SKU or barcode into the product's id, name,
+price and stock with one query: a UNION of two probes of unique indexes
+(inventory_product.sku, inventory_barcode.code), the SKU winning if both
+match. Answers, unknown codes included, are kept in a process-local LRU so
+repeat scans at a busy till never reach the database.
+
+Saving or deleting a product or barcode drops its entries, and so do the
+stock updates in billing.services and inventory.ledger. Writes made by
+another process show up after at most SCAN_CACHE_TIMEOUT seconds, so the
+quantity is a hint for the cashier; creating the order checks stock again.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.signals import post_delete, post_save
+
+from .models import Barcode, Product
+
+CACHE_SIZE = 10000
+CACHE_TIMEOUT = 30  # seconds
+FIELDS = ("id", "sku", "name", "price", "quantity")
+
+
+class LRUCache:
+    """Thread-safe ``code -> product dict (or None)`` map with expiry and a reverse index by product id."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()  # code -> (expires, product)
+        self._codes = {}  # product id -> codes cached for it
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, code):
+        """``(hit, product)``; a hit may carry None for a code that matches nothing."""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                self._drop(code)
+                return False, None
+            self._entries.move_to_end(code)
+            return True, entry[1]
+
+    def set(self, code, product):
+        with self._lock:
+            self._drop(code)
+            self._entries[code] = (time.monotonic() + self.timeout, product)
+            if product is not None:
+                self._codes.setdefault(product["id"], set()).add(code)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def discard(self, product_ids=(), codes=()):
+        with self._lock:
+            for pk in product_ids:
+                for code in list(self._codes.get(pk, ())):
+                    self._drop(code)
+            for code in codes:
+                self._drop(code)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._codes.clear()
+
+    def _drop(self, code):
+        entry = self._entries.pop(code, None)
+        if entry is not None and entry[1] is not None:
+            codes = self._codes.get(entry[1]["id"])
+            if codes is not None:
+                codes.discard(code)
+                if not codes:
+                    del self._codes[entry[1]["id"]]
+
+
+_cache = LRUCache(
+    getattr(settings, "SCAN_CACHE_SIZE", CACHE_SIZE),
+    getattr(settings, "SCAN_CACHE_TIMEOUT", CACHE_TIMEOUT),
+)
+
+
+def lookup(code, using=None):
+    """The product dict for ``code`` straight from the database, or None."""
+    products = Product.objects.using(using) if using else Product.objects
+    by_sku = products.filter(sku=code).order_by().values(*FIELDS, rank=Value(0))
+    by_barcode = products.filter(barcodes__code=code).order_by().values(*FIELDS, rank=Value(1))
+    for row in by_sku.union(by_barcode, all=True).order_by("rank")[:1]:
+        del row["rank"]
+        return row
+    return None
+
+
+def resolve(code):
+    """``{"id", "sku", "name", "price", "quantity"}`` for a scanned code, or None; cached."""
+    code = (code or "").strip()
+    if not code:
+        return None
+    hit, product = _cache.get(code)
+    if not hit:
+        product = lookup(code)
+        _cache.set(code, product)
+    return product
+
+
+def forget(*product_ids, codes=()):
+    """Drop the cached scans of these products and codes in this process."""
+    _cache.discard(product_ids, codes)
+
+
+def clear():
+    _cache.clear()
+
+
+def _product_changed(sender, instance, **kwargs):
+    # the SKU key covers a cached miss for a SKU that was just assigned
+    forget(instance.pk, codes=[instance.sku] if instance.sku else ())
+
+
+def _barcode_changed(sender, instance, **kwargs):
+    forget(instance.product_id, codes=[instance.code])
+
+
+def connect_signals():
+    post_save.connect(_product_changed, sender=Product, dispatch_uid="scan-product-save")
+    post_delete.connect(_product_changed, sender=Product, dispatch_uid="scan-product-delete")
+    post_save.connect(_barcode_changed, sender=Barcode, dispatch_uid="scan-barcode-save")
+    post_delete.connect(_barcode_changed, sender=Barcode, dispatch_uid="scan-barcode-delete")
@@ -0,0 +1,143 @@
+import re
+from decimal import Decimal
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "inventory_product_fts"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# bm25 column weights: name, description, category
+RANK = f"bm25({FTS_TABLE}, 10.0, 1.0, 4.0)"
+
+_CATEGORY_NAME = "(SELECT name FROM inventory_category WHERE id = new.category_id)"
+
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_fts_ai AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, coalesce(new.description, ''), {_CATEGORY_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_fts_ad AFTER DELETE ON inventory_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_fts_au
+        AFTER UPDATE OF name, description, category_id ON inventory_product BEGIN
+        UPDATE {FTS_TABLE}
+           SET name = new.name, description = coalesce(new.description, ''), category = {_CATEGORY_NAME}
+         WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_category_fts_au AFTER UPDATE OF name ON inventory_category BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+         WHERE rowid IN (SELECT id FROM inventory_product WHERE category_id = new.id);
+    END""",
+]
+
+
+TRIGGERS = ["inventory_product_fts_ai", "inventory_product_fts_ad", "inventory_product_fts_au", "inventory_category_fts_au"]
+
+
+def is_supported(using="default"):
+    return connections[using].vendor == "sqlite"
+
+
+def install(using="default"):
+    """
+    Create the FTS5 table and the triggers that keep it in sync with
+    inventory_product / inventory_category. Safe to call repeatedly; it runs
+    after every migrate because SQLite table rebuilds drop triggers.
+    """
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        created = cursor.fetchone() is None
+        for statement in SCHEMA:
+            cursor.execute(statement)
+    if created:
+        rebuild(using)
+
+
+def drop_triggers(using="default"):
+    """
+    Run before migrate: SQLite rebuilds a table by dropping and renaming it,
+    which the category trigger (it names inventory_product) refuses. install()
+    puts the triggers back afterwards; run rebuild_product_search if a
+    migration rewrites product names.
+    """
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def rebuild(using="default"):
+    """Repopulate the index from scratch; returns the number of indexed products."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"""INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+                SELECT p.id, p.name, coalesce(p.description, ''), c.name
+                  FROM inventory_product p JOIN inventory_category c ON c.id = p.category_id"""
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query where every word is a prefix term."""
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+
+def filter_products(queryset, query):
+    """Restrict a Product queryset to rows matching ``query``."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not is_supported(queryset.db):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query)
+        )
+    return queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+    )
+
+
+def ranked_products(query, limit=10, using=None, in_stock=False):
+    """Best matches first, as dicts suitable for JSON autocomplete; reads go through the router."""
+    from .models import Product
+
+    expression = match_expression(query)
+    if not expression:
+        return []
+    using = using or router.db_for_read(Product)
+    columns = ["id", "name", "category", "price", "quantity"]
+    if not is_supported(using):
+        products = filter_products(Product.objects.using(using), query)
+        if in_stock:
+            products = products.filter(quantity__gt=0)
+        rows = products.values_list("id", "name", "category__name", "price", "quantity")[:limit]
+    else:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"""SELECT p.id, p.name, c.name, p.price, p.quantity
+                      FROM {FTS_TABLE}
+                      JOIN inventory_product p ON p.id = {FTS_TABLE}.rowid
+                      JOIN inventory_category c ON c.id = p.category_id
+                     WHERE {FTS_TABLE} MATCH %s{" AND p.quantity > 0" if in_stock else ""}
+                     ORDER BY {RANK}
+                     LIMIT %s""",
+                [expression, limit],
+            )
+            rows = [
+                (pk, name, category, Decimal(str(price)).quantize(Decimal("0.01")), quantity)
+                for pk, name, category, price, quantity in cursor.fetchall()
+            ]
+    return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,65 @@
+"""
+``{% cache_for "name" obj [vary ...] %} ... {% endcache_for %}``
+
+Caches the enclosed fragment under a key built from the fragment name, the
+object's model, pk and ``updated_at``, and any extra vary values (model
+instances among them contribute their own pk and ``updated_at``). A save
+changes the key, so nothing is invalidated explicitly: superseded entries
+are never read again and age out of the FRAGMENT_CACHE backend (LRU-culled
+locmem by default).
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+
+register = template.Library()
+
+TIMEOUT = 24 * 60 * 60
+
+
+def version(value):
+    """The part of the key contributed by one value."""
+    if isinstance(value, Model):
+        stamp = getattr(value, "updated_at", None)
+        return f"{value._meta.label_lower}:{value.pk}:{stamp.isoformat() if stamp else ''}"
+    return str(value)
+
+
+def fragment_key(name, obj, vary=()):
+    digest = hashlib.md5("|".join(version(value) for value in (obj, *vary)).encode()).hexdigest()
+    return f"fragment:{name}:{digest}"
+
+
+class CacheForNode(template.Node):
+    def __init__(self, nodelist, name, obj, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.vary = vary
+
+    def render(self, context):
+        obj = self.obj.resolve(context)
+        alias = getattr(settings, "FRAGMENT_CACHE", "default")
+        if obj is None or alias is None:
+            return self.nodelist.render(context)
+        cache = caches[alias]
+        key = fragment_key(self.name.resolve(context), obj, [value.resolve(context) for value in self.vary])
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, getattr(settings, "FRAGMENT_CACHE_TIMEOUT", TIMEOUT))
+        return html
+
+
+@register.tag
+def cache_for(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and an object.")
+    nodelist = parser.parse(("endcache_for",))
+    parser.delete_first_token()
+    name, obj, *vary = (parser.compile_filter(bit) for bit in bits[1:])
+    return CacheForNode(nodelist, name, obj, vary)
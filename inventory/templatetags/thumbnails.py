@@ -0,0 +1,33 @@
+"""
+``{% thumbnail product.image "thumb" [alt] %}``
+
+Renders a ``<picture>`` with the WebP variant from inventory.thumbnails and
+the JPEG one as the fallback ``<img>``. While the variants are still being
+generated it shows the original, and without an upload the placeholder.
+"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from inventory import thumbnails
+
+register = template.Library()
+
+PLACEHOLDER = "css/images/no-image.png"
+
+
+@register.simple_tag
+def thumbnail(image, variant="thumb", alt=""):
+    width, height = thumbnails.VARIANTS[variant]
+    style = f"max-width:{width}px;max-height:{height}px"
+    if not image:
+        return format_html('<img src="{}" alt="{}" style="{}" loading="lazy">', static(PLACEHOLDER), alt, style)
+    urls = thumbnails.urls(image, variant)
+    if urls is None:
+        return format_html('<img src="{}" alt="{}" style="{}" loading="lazy">', image.url, alt, style)
+    webp, jpeg = urls
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" style="{}" loading="lazy" decoding="async"></picture>',
+        webp, jpeg, alt, style,
+    )
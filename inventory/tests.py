@@ -1,3 +1,626 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from contextlib import closing
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Barcode, Category, Product, StockTransaction
+from .pagination import EstimatedCountPaginator, keyset_paginate
+from . import dashboard, db, exports, imports, ledger, profiling, reports, routing, scan, search, thumbnails, views
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Belts")
+        # duplicate names exercise the pk tie-breaker
+        Product.objects.bulk_create(
+            Product(category=category, name=f"Belt {i // 2:02d}", price=Decimal("1.00"), quantity=i)
+            for i in range(25)
+        )
+
+    def _walk(self, per_page):
+        factory = RequestFactory()
+        request = factory.get("/products/")
+        seen = []
+        while True:
+            page = keyset_paginate(request, Product.objects.all(), "name", per_page=per_page)
+            self.assertEqual(page.start_index, len(seen) + 1)
+            seen.extend(p.pk for p in page)
+            if not page.has_next:
+                return seen, page
+            request = factory.get("/products/" + page.next_url)
+
+    def test_forward_walk_visits_every_row_once_in_order(self):
+        seen, _ = self._walk(per_page=4)
+        expected = list(Product.objects.order_by("name", "pk").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_prior_page(self):
+        factory = RequestFactory()
+        first = keyset_paginate(factory.get("/"), Product.objects.all(), "name", per_page=5)
+        second = keyset_paginate(factory.get("/" + first.next_url), Product.objects.all(), "name", per_page=5)
+        back = keyset_paginate(factory.get("/" + second.previous_url), Product.objects.all(), "name", per_page=5)
+        self.assertEqual([p.pk for p in back], [p.pk for p in first])
+        self.assertEqual(back.start_index, 1)
+
+    def test_stream_mode_renders_all_rows(self):
+        response = self.client.get(reverse("inventory:product-list"), {"stream": "1"})
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body.count("/edit/"), 25)
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.filters = Category.objects.create(name="Filters")
+        belts = Category.objects.create(name="Belts")
+        cls.oil = Product.objects.create(category=cls.filters, name="Oil Filter", price=Decimal("5.00"))
+        cls.air = Product.objects.create(
+            category=cls.filters, name="Air Cleaner", description="Heavy duty element", price=Decimal("7.00")
+        )
+        cls.fan = Product.objects.create(category=belts, name="Fan Belt", price=Decimal("3.00"))
+
+    def _search(self, query):
+        return set(search.filter_products(Product.objects.all(), query))
+
+    def test_prefix_match_over_name_description_and_category(self):
+        self.assertEqual(self._search("oil"), {self.oil})
+        self.assertEqual(self._search("elem"), {self.air})
+        self.assertEqual(self._search("filt"), {self.oil, self.air})
+        self.assertEqual(self._search('"; DROP'), set())
+
+    def test_index_follows_product_and_category_changes(self):
+        self.fan.name = "Cooling Fan Belt"
+        self.fan.save()
+        self.assertEqual(self._search("cool"), {self.fan})
+        self.filters.name = "Strainers"
+        self.filters.save()
+        self.assertEqual(self._search("strain"), {self.oil, self.air})
+        self.oil.delete()
+        self.assertEqual(self._search("strain"), {self.air})
+
+    def test_autocomplete_ranks_name_matches_first(self):
+        response = self.client.get(reverse("inventory:product-search"), {"q": "filter"})
+        results = response.json()["results"]
+        self.assertEqual(results[0]["name"], "Oil Filter")
+        self.assertEqual(results[0]["price"], "5.00")
+
+    def test_ranked_products_reads_through_the_router(self):
+        with mock.patch.object(search.router, "db_for_read", return_value="default") as db_for_read:
+            self.assertEqual([row["name"] for row in search.ranked_products("oil")], ["Oil Filter"])
+        db_for_read.assert_called_once_with(Product)
+
+    def test_autocomplete_limit_is_clamped(self):
+        # a negative LIMIT means "no limit" to SQLite
+        for limit in ("-1", "0"):
+            response = self.client.get(reverse("inventory:product-search"), {"q": "filt", "limit": limit})
+            self.assertEqual(len(response.json()["results"]), 1)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Seals")
+        Product.objects.create(category=category, name="Seal", price=Decimal("2.50"), quantity=4, minimum_stock=5)
+        Product.objects.create(category=category, name="Ring", price=Decimal("1.00"), quantity=10)
+
+    def test_metrics(self):
+        metrics = dashboard.get_metrics()
+        self.assertEqual(metrics["product_count"], 2)
+        self.assertEqual(metrics["low_stock_count"], 1)
+        self.assertEqual(metrics["stock_value"], Decimal("20.00"))
+        self.assertEqual(metrics["order_count"], 0)
+
+    def test_warm_cache_runs_no_queries_and_saves_invalidate(self):
+        dashboard.get_metrics()
+        with self.assertNumQueries(0):
+            dashboard.get_metrics()
+        Product.objects.create(category=Category.objects.get(), name="Gasket", price=Decimal("1.00"))
+        self.assertEqual(dashboard.get_metrics()["product_count"], 3)
+
+    def test_stock_in_invalidates(self):
+        dashboard.get_metrics()
+        ledger.stock_in(Product.objects.get(name="Seal"), 6)
+        metrics = dashboard.get_metrics()
+        self.assertEqual(metrics["low_stock_count"], 0)
+        self.assertEqual(metrics["stock_value"], Decimal("35.00"))
+
+
+class ReorderReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from billing.models import Customer
+        from billing.services import create_order
+
+        category = Category.objects.create(name="Pumps")
+        cls.pump = Product.objects.create(category=category, name="Pump", price=Decimal("1.00"), quantity=40, minimum_stock=5)
+        cls.valve = Product.objects.create(category=category, name="Valve", price=Decimal("1.00"), quantity=2, minimum_stock=5)
+        cls.idle = Product.objects.create(category=category, name="Idle", price=Decimal("1.00"), quantity=50, minimum_stock=5)
+        create_order(Customer.objects.create(name="Ali"), {cls.pump.pk: 30})
+
+    def test_low_stock_products(self):
+        self.assertEqual(list(reports.low_stock_products()), [self.valve])
+
+    def test_suggestions_use_sales_velocity_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = {p.name: p.suggested for p in reports.reorder_report(window_days=30, cover_days=30)}
+        # pump: 5 min + 30 sold over the window - 10 left; valve: 5 min - 2 left
+        self.assertEqual(rows, {"Pump": 25, "Valve": 3})
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Hoses")
+
+    def test_order_and_stock_in_write_ledger_rows(self):
+        from billing.models import Customer
+        from billing.services import create_order
+
+        hose = Product.objects.create(category=self.category, name="Hose", price=Decimal("4.00"), quantity=10)
+        ledger.stock_in(hose, 5, notes="PO-1")
+        create_order(Customer.objects.create(name="Ali"), {hose.pk: 3})
+        entries = list(hose.transactions.order_by("pk").values_list("transaction_type", "quantity"))
+        self.assertEqual(entries, [("IN", 5), ("OUT", 3)])
+        hose.refresh_from_db()
+        self.assertEqual(hose.quantity, 12)
+
+    def test_form_edit_records_delta(self):
+        hose = Product.objects.create(category=self.category, name="Hose", price=Decimal("4.00"), quantity=10)
+        self.client.post(
+            reverse("inventory:product-update", args=[hose.pk]),
+            {"name": "Hose", "category": self.category.pk, "price": "4.00", "quantity": 7, "minimum_stock": 0},
+        )
+        self.assertEqual(list(hose.transactions.values_list("transaction_type", "quantity")), [("OUT", 3)])
+
+    def test_stock_as_of_starts_from_latest_snapshot(self):
+        hose = Product.objects.create(category=self.category, name="Hose", price=Decimal("4.00"), quantity=10)
+        ledger.take_snapshot()
+        ledger.stock_in(hose, 5)
+        checkpoint = timezone.now()
+        ledger.stock_in(hose, 2)
+        self.assertEqual(ledger.stock_as_of(hose, checkpoint), 15)
+        ledger.take_snapshot()
+        ledger.stock_in(hose, 1)
+        # latest snapshot (17) + one later entry, not the whole history
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.stock_as_of(hose, timezone.now()), 18)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Filters')
+        Product.objects.bulk_create(
+            Product(category=category, name=f'Part, "{i}"', price=Decimal('2.50'), quantity=i) for i in range(1200)
+        )
+
+    def test_csv_streams_every_row(self):
+        response = self.client.get(reverse('inventory:product-export'))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="products-', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3], ['ID', 'Name', 'Category'])
+        self.assertEqual(len(rows), 1201)
+        self.assertEqual(rows[1][1:5], ['Part, "0"', 'Filters', '2.50', '0'])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        response = self.client.get(reverse('inventory:product-export'), {'format': 'xlsx'})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 1201)
+        self.assertIn('<t xml:space="preserve">Part, "0"</t>', sheet)
+
+    def test_formula_like_text_is_quoted(self):
+        for text in ('=HYPERLINK("http://x")', '+1', '-2+3', '@SUM(A1)', '\tx', '\rx'):
+            self.assertEqual(exports.cell(text), "'" + text)
+        self.assertEqual(exports.cell('Oil = 5W30'), 'Oil = 5W30')
+        self.assertEqual(exports.cell(Decimal('-2.50')), Decimal('-2.50'))
+        Product.objects.filter(quantity=0).update(name='=1+1')
+        body = b''.join(self.client.get(reverse('inventory:product-export')).streaming_content).decode('utf-8-sig')
+        self.assertEqual(list(csv.reader(io.StringIO(body)))[1][1], "'=1+1")
+        # and an edited export imports back as it was
+        self.assertEqual(imports.clean_row({'name': "'=1+1", 'category': 'Filters', 'price': '1'})['name'], '=1+1')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('inventory:product-export'), {'format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductImportTests(TestCase):
+    def _import(self, text, fmt='csv', **kwargs):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.error_path = os.path.join(directory, 'errors.csv')
+        rows = imports.reader_for(io.StringIO(text), fmt)
+        return imports.import_products(rows, error_path=self.error_path, **kwargs)
+
+    def test_creates_updates_and_reports_bad_rows(self):
+        existing = Product.objects.create(
+            category=Category.objects.create(name='Filters'), name='Old name', price=Decimal('1.00'), quantity=5,
+        )
+        result = self._import(
+            'ID,Name,Category,Price,Quantity\n'
+            f'{existing.pk},Oil filter,filters,12.5,8\n'
+            ',Fan belt,Belts,4,3\n'
+            ',,Belts,4,3\n'
+            ',Hose,Belts,cheap,1\n',
+            batch_size=2,
+        )
+        self.assertEqual((result.rows, result.created, result.updated, result.failed), (4, 1, 1, 2))
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.price, existing.quantity), ('Oil filter', Decimal('12.50'), 8))
+        self.assertEqual(Product.objects.get(name='Fan belt').category.name, 'Belts')
+        self.assertEqual(
+            sorted(StockTransaction.objects.values_list('product__name', 'transaction_type', 'quantity')),
+            [('Fan belt', 'IN', 3), ('Oil filter', 'IN', 3)],
+        )
+        with open(self.error_path) as fh:
+            errors = list(csv.reader(fh))
+        self.assertEqual([row[:2] for row in errors[1:]], [['4', 'name is required.'], ['5', 'price must be a number.']])
+
+    def test_json_lines_keep_unsupplied_columns(self):
+        product = Product.objects.create(
+            category=Category.objects.create(name='Filters'), name='Oil filter', price=Decimal('1.00'), quantity=7,
+        )
+        result = self._import(
+            f'{{"id": {product.pk}, "name": "Oil filter", "category": "Filters", "price": 2}}\n'
+            '{"name": "Air filter", "category": "Filters", "price": "3.10", "quantity": 4}\n',
+            fmt='json',
+        )
+        self.assertEqual((result.created, result.updated, result.failed), (1, 1, 0))
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.quantity), (Decimal('2.00'), 7))
+
+    def test_rows_without_id_update_by_sku(self):
+        product = Product.objects.create(
+            category=Category.objects.create(name='Filters'), name='Oil filter', sku='OF-1', price=Decimal('1.00'),
+        )
+        result = self._import('sku,name,category,price\nOF-1,Oil filter XL,Filters,2\nAF-1,Air filter,Filters,3\n')
+        self.assertEqual((result.created, result.updated, result.failed), (1, 1, 0))
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price), ('Oil filter XL', Decimal('2.00')))
+        self.assertEqual(Product.objects.get(sku='AF-1').name, 'Air filter')
+
+    def test_renamed_products_touch_their_orders(self):
+        from billing.models import Customer, Order
+        from billing.services import create_order
+
+        product = Product.objects.create(
+            category=Category.objects.create(name='Filters'), name='Oil filter', sku='OF-1', price=Decimal('1.00'),
+            quantity=5,
+        )
+        order = create_order(Customer.objects.create(name='Ali'), {product.pk: 1})
+        Order.objects.filter(pk=order.pk).update(updated_at=order.updated_at - timedelta(days=1))
+        stamp = Order.objects.get(pk=order.pk).updated_at
+
+        self._import('sku,name,category,price\nOF-1,Oil filter,Filters,2\n')
+        self.assertEqual(Order.objects.get(pk=order.pk).updated_at, stamp)
+        self._import('sku,name,category,price\nOF-1,Oil filter XL,Filters,2\n')
+        self.assertGreater(Order.objects.get(pk=order.pk).updated_at, stamp)
+
+    def test_upload_view(self):
+        upload = SimpleUploadedFile('catalog.csv', b'\xef\xbb\xbfname,category,price\nBelt,Belts,4\n')
+        response = self.client.post(
+            reverse('inventory:product-import'), {'file': upload, 'create_categories': 'on'}, follow=True,
+        )
+        self.assertContains(response, '1 rows: 1 created, 0 updated, 0 failed')
+        self.assertTrue(Product.objects.filter(name='Belt', category__name='Belts').exists())
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Filters')
+        cls.products = Product.objects.bulk_create(
+            Product(category=category, name=f'Part {i}', price=Decimal('1.00')) for i in range(6)
+        )
+
+    def setUp(self):
+        profiling.registry.reset()
+
+    def test_repeated_query_shapes_are_fingerprinted(self):
+        profile = profiling.RequestProfile()
+        with connection.execute_wrapper(profile):
+            for product in self.products:
+                Product.objects.get(pk=product.pk)
+            list(Product.objects.filter(pk__in=[p.pk for p in self.products]))
+        self.assertEqual(profile.queries, 7)
+        [(shape, count)] = profile.duplicates(threshold=5)
+        self.assertEqual(count, 6)
+        self.assertIn('WHERE "inventory_product"."id" = %s', shape)
+
+    @override_settings(PROFILING_SERVER_TIMING=True, PROFILING_MAX_QUERIES=1)
+    def test_middleware_sets_header_records_view_and_logs(self):
+        with self.assertLogs('inventory.profiling', 'WARNING') as logs:
+            response = self.client.get(reverse('inventory:product-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=')
+        self.assertIn('(inventory:product-list)', logs.output[0])
+        stats = profiling.registry.snapshot()['inventory:product-list']
+        self.assertEqual((stats['requests'], stats['slow_requests']), (1, 1))
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse('profiling-stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.client.get(reverse('inventory:home'))
+        self.assertIn('inventory:home', self.client.get(url).json()['views'])
+
+
+class SqliteTuningTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        values = db.current_pragmas(connection)
+        self.assertEqual(values["synchronous"], 1)  # NORMAL
+        self.assertEqual(values["busy_timeout"], 5000)
+        self.assertEqual(values["cache_size"], -64000)
+
+    @override_settings(SQLITE_PRAGMAS={"busy_timeout": 250, "mmap_size": None})
+    def test_settings_override_and_drop_defaults(self):
+        self.assertEqual(db.pragmas()["busy_timeout"], 250)
+        self.assertNotIn("mmap_size", db.pragmas())
+        self.assertEqual(db.pragmas()["journal_mode"], "wal")
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = routing.PrimaryReplicaRouter(replica="replica")
+
+    def test_reads_use_replica_only_where_annotated_and_before_a_write(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+        with routing.request_scope(), routing.replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), "replica")
+            with routing.primary_reads():
+                self.assertIsNone(self.router.db_for_read(Product))
+            self.router.db_for_write(Product)
+            self.assertIsNone(self.router.db_for_read(Product))
+        self.assertFalse(self.router.allow_migrate("replica", "inventory"))
+        self.assertTrue(self.router.allow_migrate("default", "inventory"))
+
+    def test_streamed_body_of_a_replica_view_reads_from_replica(self):
+        seen = []
+
+        def rows():
+            seen.append(self.router.db_for_read(Product))
+            yield b"row"
+
+        view = routing.use_replica(lambda request: StreamingHttpResponse(rows()))
+        with routing.request_scope():
+            response = view(RequestFactory().get("/"))
+        self.assertEqual(seen, [])
+        self.assertEqual(b"".join(response.streaming_content), b"row")
+        self.assertEqual(seen, ["replica"])
+
+    def test_replicate_copies_the_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source, target = os.path.join(directory, "primary.sqlite3"), os.path.join(directory, "replica.sqlite3")
+        with closing(sqlite3.connect(source)) as db_file, db_file:
+            db_file.execute("CREATE TABLE t (x)")
+            db_file.execute("INSERT INTO t VALUES (1)")
+        routing.replicate(source, target)
+        with closing(sqlite3.connect(target)) as db_file:
+            self.assertEqual(db_file.execute("SELECT x FROM t").fetchall(), [(1,)])
+
+
+class FragmentCacheTests(TestCase):
+    def test_product_row_follows_stock_changes(self):
+        caches["fragments"].clear()
+        product = Product.objects.create(
+            category=Category.objects.create(name="Belts"), name="Fan belt", price=Decimal("4.00"),
+            quantity=7, minimum_stock=10,
+        )
+        url = reverse("inventory:product-list")
+        self.assertContains(self.client.get(url), "Low (7)")
+        ledger.stock_in(product, 5)
+        self.assertNotContains(self.client.get(url), "Low (")
+
+
+class ScanTests(TestCase):
+    def setUp(self):
+        scan.clear()
+        self.addCleanup(scan.clear)
+        self.product = Product.objects.create(
+            category=Category.objects.create(name="Belts"), name="Fan belt", sku="FB-100",
+            price=Decimal("4.00"), quantity=7,
+        )
+        Barcode.objects.create(product=self.product, code="8901234567890")
+        self.url = reverse("inventory:product-scan")
+
+    def test_sku_and_barcode_resolve_and_repeat_scans_are_cached(self):
+        response = self.client.get(self.url, {"code": "FB-100"})
+        self.assertEqual(
+            response.json(), {"id": self.product.pk, "sku": "FB-100", "name": "Fan belt", "price": "4.00", "quantity": 7},
+        )
+        self.assertEqual(self.client.get(self.url, {"code": "8901234567890"}).json()["id"], self.product.pk)
+        self.assertEqual(self.client.get(self.url, {"code": "nope"}).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(scan.resolve("FB-100")["quantity"], 7)
+            self.assertIsNone(scan.resolve("nope"))
+
+    def test_saves_and_stock_changes_invalidate(self):
+        scan.resolve("FB-100")
+        scan.resolve("NEW-1")
+        ledger.stock_in(self.product, 5)
+        self.assertEqual(scan.resolve("FB-100")["quantity"], 12)
+        self.product.sku = "NEW-1"
+        self.product.save()
+        self.assertIsNone(scan.resolve("FB-100"))
+        self.assertEqual(scan.resolve("NEW-1")["id"], self.product.pk)
+        Barcode.objects.filter(code="8901234567890").delete()
+        self.assertIsNone(scan.resolve("8901234567890"))
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = scan.LRUCache(max_entries=2, timeout=60)
+        cache.set("a", {"id": 1})
+        cache.set("b", {"id": 2})
+        cache.get("a")
+        cache.set("c", {"id": 3})
+        self.assertEqual([cache.get(code)[0] for code in "abc"], [True, False, True])
+        cache.discard(product_ids=[1])
+        self.assertEqual((cache.get("a"), len(cache)), ((False, None), 1))
+
+
+def _png(size=(1200, 800), color=(200, 30, 30, 128)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        caches["fragments"].clear()
+        self.category = Category.objects.create(name="Belts")
+
+    def test_upload_generates_variants_served_by_the_tag_with_long_cache(self):
+        from PIL import Image
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(reverse("inventory:product-create"), {
+                "name": "Fan belt", "category": self.category.pk, "price": "4.00", "quantity": 3, "minimum_stock": 0,
+                "image": SimpleUploadedFile("belt.png", _png(), content_type="image/png"),
+            })
+        self.assertEqual(len(callbacks), 1)
+        product = Product.objects.get(name="Fan belt")
+        storage = product.image.storage
+        for name in thumbnails.variant_names(product.image.name):
+            self.assertTrue(storage.exists(name), name)
+        with Image.open(storage.path(thumbnails.variant_name(product.image.name, "thumb", "jpg"))) as image:
+            self.assertEqual(image.size, (96, 64))
+
+        webp, jpeg = thumbnails.urls(product.image, "thumb")
+        html = self.client.get(reverse("inventory:product-list")).content.decode()
+        self.assertIn(f'<source srcset="{webp}" type="image/webp">', html)
+        self.assertIn(f'<img src="{jpeg}"', html)
+
+        # the media URLs are only routed with DEBUG on, so call the view directly
+        def served(name):
+            return views.media(RequestFactory().get("/media/" + name), name, document_root=storage.location)
+
+        self.assertIn("immutable", served(thumbnails.variant_name(product.image.name, "thumb", "jpg"))["Cache-Control"])
+        self.assertFalse(served(product.image.name).has_header("Cache-Control"))
+
+    def test_variants_are_queued_only_after_commit(self):
+        product = Product(category=self.category, name="Fan belt", price=Decimal("4.00"))
+        product.image = SimpleUploadedFile("belt.png", _png(), content_type="image/png")
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            with self.captureOnCommitCallbacks() as committed:
+                product.save()
+            schedule.assert_not_called()
+            committed[0]()
+            schedule.assert_called_once_with(product.image.name)
+
+            with self.captureOnCommitCallbacks() as rolled_back:
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    product.image = SimpleUploadedFile("new.png", _png(), content_type="image/png")
+                    product.save()
+                    raise IntegrityError
+        self.assertEqual(rolled_back, [])
+        self.assertEqual(schedule.call_count, 1)
+
+    def test_tag_falls_back_to_original_then_placeholder_and_backfill_fills_in(self):
+        product = Product.objects.create(category=self.category, name="Fan belt", price=Decimal("4.00"))
+        url = reverse("inventory:product-detail", args=[product.pk])
+        self.assertContains(self.client.get(url), "css/images/no-image.png")
+
+        # stored without going through the upload signal, like images from before the pipeline
+        name = product.image.storage.save("product_images/old.png", io.BytesIO(_png()))
+        Product.objects.filter(pk=product.pk).update(image=name, updated_at=timezone.now())
+        self.assertContains(self.client.get(url), f'<img src="/media/{name}"')
+
+        out = io.StringIO()
+        call_command("generate_thumbnails", workers=1, stdout=out)
+        self.assertIn("1 images: 4 variants written, 0 failed.", out.getvalue())
+        self.assertContains(self.client.get(url), thumbnails.variant_name(name, "detail", "webp"))
+
+
+class ProductAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password=None)
+        category = Category.objects.create(name="Belts")
+        cls.products = Product.objects.bulk_create(
+            Product(category=category, name=f"Belt {i}", price=Decimal("1.00"), quantity=10) for i in range(6)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _post(self, rows):
+        data = {"_save": "Save", "form-TOTAL_FORMS": len(rows), "form-INITIAL_FORMS": len(rows)}
+        for index, (pk, quantity, price) in enumerate(rows):
+            data.update({
+                f"form-{index}-id": pk, f"form-{index}-quantity": quantity,
+                f"form-{index}-minimum_stock": 0, f"form-{index}-price": price,
+            })
+        return self.client.post(reverse("admin:inventory_product_changelist"), data)
+
+    def test_list_editable_save_is_one_bulk_update_regardless_of_rows(self):
+        from django.contrib.admin.models import LogEntry
+        from django.contrib.contenttypes.models import ContentType
+
+        ContentType.objects.get_for_model(Product)  # cached from here on
+        with CaptureQueriesContext(connection) as two:
+            self._post([(p.pk, 12 if i % 2 else 10, "2.00") for i, p in enumerate(self.products[:2])])
+        with CaptureQueriesContext(connection) as six:
+            response = self._post([(p.pk, 12 if i % 2 else 10, "3.00") for i, p in enumerate(self.products)])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(two), len(six))
+
+        self.assertEqual(sorted(Product.objects.values_list("quantity", flat=True)), [10, 10, 10, 12, 12, 12])
+        self.assertEqual(set(Product.objects.values_list("price", flat=True)), {Decimal("3.00")})
+        self.assertEqual(StockTransaction.objects.filter(transaction_type="IN", quantity=2).count(), 3)
+        self.assertEqual(LogEntry.objects.count(), 8)
+
+    def test_unknown_row_is_reported_not_saved(self):
+        for unknown in (10 ** 9, "abc"):
+            response = self._post([(self.products[0].pk, 99, "9.00"), (unknown, 99, "9.00")])
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(Product.objects.filter(quantity=99).exists())
+
+    def test_stock_ledger_rows_cannot_be_deleted(self):
+        entry = ledger.stock_in(self.products[0], 5).transactions.get()
+        response = self.client.get(reverse("admin:inventory_stocktransaction_changelist"))
+        self.assertNotIn("delete_selected", response.context["cl"].model_admin.get_actions(response.wsgi_request))
+        response = self.client.get(reverse("admin:inventory_stocktransaction_delete", args=[entry.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_unfiltered_lists_use_the_estimate_filtered_ones_count(self):
+        category = Category.objects.create(name="Belts")
+        products = Product.objects.bulk_create(
+            Product(category=category, name=f"Belt {i}", price=Decimal("1.00")) for i in range(5)
+        )
+        products[-2].delete()
+        with override_settings(ADMIN_ESTIMATE_COUNT_THRESHOLD=0):
+            self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 2).count, products[-1].pk)
+            self.assertEqual(EstimatedCountPaginator(Product.objects.filter(name__startswith="Belt"), 2).count, 4)
+        self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 2).count, 4)
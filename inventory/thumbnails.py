@@ -0,0 +1,150 @@
+"""
+Resized variants of product images.
+
+Every uploaded image gets a WebP and a JPEG copy per size in VARIANTS,
+stored next to the original: ``product_images/belt.jpg`` gains
+``product_images/belt.thumb-96.webp``, ``belt.thumb-96.jpg`` and so on. The
+size is part of the name and a re-upload gets a new original name, so a
+variant URL never changes content and can be cached for a year
+(THUMBNAIL_CACHE_SECONDS, see inventory.views.media).
+
+A product save that carries a new upload (ProductForm, the admin) queues
+generation, once the save has committed, on a small thread pool (THUMBNAIL_WORKERS; 0 generates inline)
+and returns; when the variants are written the product's updated_at moves
+so cached fragments pick them up. Until then ``{% thumbnail %}`` falls back
+to the original. ``manage.py generate_thumbnails`` backfills existing images.
+"""
+import io
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .models import Product
+
+logger = logging.getLogger("inventory.thumbnails")
+
+# name -> bounding box; the aspect ratio is kept
+VARIANTS = {"thumb": (96, 96), "detail": (600, 600)}
+# extension -> Pillow format and save options; the JPEG is the <img> fallback
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+WORKERS = 2
+CACHE_SECONDS = 365 * 24 * 60 * 60
+
+_executor = None
+
+
+def variant_name(name, variant, extension):
+    """Storage name of one variant of the original ``name``."""
+    width, height = VARIANTS[variant]
+    root, _ = os.path.splitext(name)
+    suffix = f"{variant}-{width}" if width == height else f"{variant}-{width}x{height}"
+    return f"{root}.{suffix}.{extension}"
+
+
+def is_variant(name):
+    stem, extension = os.path.splitext(name)
+    return extension[1:] in FORMATS and any(
+        os.path.splitext(stem)[1].startswith(f".{variant}-") for variant in VARIANTS
+    )
+
+
+def variant_names(name):
+    return [variant_name(name, variant, extension) for variant in VARIANTS for extension in FORMATS]
+
+
+def generate(name, storage=None, force=False):
+    """Write the missing variants of ``name`` (all of them with ``force``); returns the names written."""
+    from PIL import Image, ImageOps
+
+    storage = storage or Product._meta.get_field("image").storage
+    wanted = [n for n in variant_names(name) if force or not storage.exists(n)]
+    if not wanted:
+        return []
+    with storage.open(name, "rb") as original, Image.open(original) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        # JPEG has no alpha: flatten transparent images onto white
+        flat = image
+        if image.mode == "RGBA":
+            flat = Image.new("RGB", image.size, "white")
+            flat.paste(image, mask=image.getchannel("A"))
+        written = []
+        for variant, box in VARIANTS.items():
+            for extension, (fmt, options) in FORMATS.items():
+                target = variant_name(name, variant, extension)
+                if target not in wanted:
+                    continue
+                resized = (image if fmt == "WEBP" else flat).copy()
+                resized.thumbnail(box, Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt, **options)
+                if storage.exists(target):
+                    storage.delete(target)
+                written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def _generate_and_touch(name):
+    try:
+        if generate(name):
+            # new updated_at -> cached rows and detail fragments re-render with the variants
+            Product.objects.filter(image=name).update(updated_at=timezone.now())
+    except Exception:
+        logger.exception("Thumbnail generation failed for %s", name)
+        raise
+    finally:
+        close_old_connections()
+
+
+def schedule(name):
+    """Generate the variants of ``name`` off the request thread; returns a Future."""
+    global _executor
+    workers = getattr(settings, "THUMBNAIL_WORKERS", WORKERS)
+    if not workers:
+        future = Future()
+        try:
+            future.set_result(generate(name))
+        except Exception as exc:
+            logger.exception("Thumbnail generation failed for %s", name)
+            future.set_exception(exc)
+        return future
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+    return _executor.submit(_generate_and_touch, name)
+
+
+def urls(image, variant):
+    """``(webp_url, jpeg_url)`` for a variant of an ImageField value, or None until it exists."""
+    names = [variant_name(image.name, variant, extension) for extension in FORMATS]
+    if not image.storage.exists(names[-1]):
+        return None
+    return tuple(image.storage.url(n) for n in names)
+
+
+def _note_upload(sender, instance, **kwargs):
+    # FileField.pre_save commits a fresh upload after this signal
+    image = instance.image
+    instance._image_uploaded = bool(image) and not image._committed
+
+
+def _queue_variants(sender, instance, **kwargs):
+    if getattr(instance, "_image_uploaded", False):
+        instance._image_uploaded = False
+        name = instance.image.name
+        # after commit: a rolled-back save queues nothing, and the worker's updated_at bump sees the row
+        transaction.on_commit(lambda: schedule(name))
+
+
+def connect_signals():
+    pre_save.connect(_note_upload, sender=Product, dispatch_uid="thumbnails-note-upload")
+    post_save.connect(_queue_variants, sender=Product, dispatch_uid="thumbnails-queue")
@@ -7,8 +7,17 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('products/', views.product_list, name='product-list'),
     path('products/add/', views.product_create, name='product-create'),
+    path('products/import/', views.product_import, name='product-import'),
+    path('products/import/errors/<str:name>', views.product_import_errors, name='product-import-errors'),
+    path('products/export/', views.product_export, name='product-export'),
+    path('stock/export/', views.stock_ledger_export, name='stock-ledger-export'),
+    path('products/search.json', views.product_search, name='product-search'),
+    path('products/scan.json', views.product_scan, name='product-scan'),
+    path('products/low-stock/', views.low_stock_list, name='low-stock'),
+    path('products/reorder/', views.reorder_report, name='reorder-report'),
     path('products/<int:pk>/', views.product_detail, name='product-detail'),
     path('products/<int:pk>/edit/', views.product_update, name='product-update'),
+    path('products/<int:pk>/stock-in/', views.product_stock_in, name='product-stock-in'),
     path('products/<int:pk>/delete/', views.product_delete, name='product-delete'),
 ]
 
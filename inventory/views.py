@@ -1,35 +1,92 @@
+import os
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.db import transaction
+from django.http import FileResponse, Http404, JsonResponse
+from django.views.static import serve
 from .models import Product
-from .forms import ProductForm
+from .forms import ProductForm, ProductImportForm, StockInForm
+from .pagination import keyset_paginate, stream_table
+from . import dashboard, exports, imports, ledger, reports, scan, search, thumbnails
+from .routing import use_replica
+
+AUTOCOMPLETE_LIMIT = 50
+REORDER_REPORT_LIMIT = 500
+IMPORT_ERRORS_DIR = os.path.join(settings.MEDIA_ROOT, 'imports')
 
 # Home page view
 def home(request):
-    return render(request, 'inventory/home.html')
+    return render(request, 'inventory/home.html', dashboard.get_metrics())
 
 # Product list with optional search
+@use_replica
 def product_list(request):
     query = request.GET.get('q', '')
-    products = Product.objects.all()
+    products = Product.objects.select_related('category')
     if query:
-        products = products.filter(name__icontains=query)
-    context = {
-        'products': products,
-        'search_query': query,
-    }
+        products = search.filter_products(products, query)
+    context = {'search_query': query}
+    if request.GET.get('stream') == '1':
+        return stream_table(
+            request, 'inventory/product_list.html', context, 'inventory/_product_row.html',
+            products.order_by('name', 'pk'), 'product',
+        )
+    context['products'] = keyset_paginate(request, products, 'name')
     return render(request, 'inventory/product_list.html', context)
 
+# Products at or below their minimum stock level
+@use_replica
+def low_stock_list(request):
+    products = reports.low_stock_products(Product.objects.select_related('category'))
+    page = keyset_paginate(request, products, 'name')
+    return render(request, 'inventory/low_stock_list.html', {'products': page})
+
+# Suggested reorder quantities from recent sales velocity
+@use_replica
+def reorder_report(request):
+    try:
+        window = max(int(request.GET.get('days', reports.REORDER_WINDOW_DAYS)), 1)
+        cover = max(int(request.GET.get('cover', reports.REORDER_COVER_DAYS)), 0)
+    except ValueError:
+        window, cover = reports.REORDER_WINDOW_DAYS, reports.REORDER_COVER_DAYS
+    rows = reports.reorder_report(window_days=window, cover_days=cover)[:REORDER_REPORT_LIMIT]
+    context = {'rows': rows, 'window': window, 'cover': cover, 'limit': REORDER_REPORT_LIMIT}
+    return render(request, 'inventory/reorder_report.html', context)
+
+# Ranked prefix search for autocomplete widgets
+@use_replica
+def product_search(request):
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': search.ranked_products(query, limit=limit)})
+
+# Scanned SKU / barcode -> id, price and stock for the till (process-local LRU in front)
+# Stays on primary: a lagging replica would refill the cache with what a save just dropped
+def product_scan(request):
+    product = scan.resolve(request.GET.get('code', ''))
+    if product is None:
+        return JsonResponse({'error': 'Unknown code.'}, status=404)
+    return JsonResponse(product)
+
 # Product detail view
 def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk)
-    return render(request, 'inventory/product_detail.html', {'product': product})
+    product = get_object_or_404(Product.objects.select_related('category'), pk=pk)
+    transactions = product.transactions.all()[:10]
+    return render(request, 'inventory/product_detail.html', {'product': product, 'transactions': transactions})
 
 # Create a new product
 def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
-            product = form.save()
+            with transaction.atomic():
+                product = form.save()
+                ledger.record_form_change(form, notes='Opening stock')
             messages.success(request, f'Product "{product.name}" was created successfully.')
             return redirect('inventory:product-list')  # <--- namespace here
         else:
@@ -44,7 +101,9 @@ def product_update(request, pk):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            product = form.save()
+            with transaction.atomic():
+                product = form.save()
+                ledger.record_form_change(form, notes='Manual adjustment')
             messages.success(request, f'Product "{product.name}" was updated successfully.')
             return redirect('inventory:product-detail', pk=product.pk)  # <--- namespace here
         else:
@@ -53,6 +112,20 @@ def product_update(request, pk):
         form = ProductForm(instance=product)
     return render(request, 'inventory/product_form.html', {'form': form, 'title': 'Edit Product'})
 
+# Receive stock for a product
+def product_stock_in(request, pk):
+    product = get_object_or_404(Product, pk=pk)
+    if request.method == 'POST':
+        form = StockInForm(request.POST)
+        if form.is_valid():
+            ledger.stock_in(product, form.cleaned_data['quantity'], notes=form.cleaned_data['notes'] or None)
+            messages.success(request, f'Received {form.cleaned_data["quantity"]} × "{product.name}".')
+            return redirect('inventory:product-detail', pk=product.pk)
+        messages.error(request, 'Please correct the errors below.')
+    else:
+        form = StockInForm()
+    return render(request, 'inventory/stock_in_form.html', {'form': form, 'product': product})
+
 # Delete a product
 def product_delete(request, pk):
     product = get_object_or_404(Product, pk=pk)
@@ -70,3 +143,53 @@ def product_delete(request, pk):
 
 
 
+
+# Streamed CSV / XLSX exports
+@use_replica
+def product_export(request):
+    return exports.respond(request, exports.PRODUCTS)
+
+@use_replica
+def stock_ledger_export(request):
+    return exports.respond(request, exports.STOCK_TRANSACTIONS)
+
+# Bulk product import (CSV / JSON upload)
+def product_import(request):
+    result = error_file = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            error_file = imports.error_file_name()
+            try:
+                result = imports.import_products(
+                    imports.reader_for(imports.text_stream(upload.file), imports.format_from_name(upload.name)),
+                    error_path=os.path.join(IMPORT_ERRORS_DIR, error_file),
+                    create_categories=form.cleaned_data['create_categories'],
+                )
+            except (imports.ImportFormatError, UnicodeDecodeError) as exc:
+                messages.error(request, f'Could not read {upload.name}: {exc}')
+            else:
+                messages.success(request, f'Imported {result}.')
+                if not result.failed:
+                    error_file = None
+    else:
+        form = ProductImportForm()
+    return render(request, 'inventory/product_import.html', {
+        'form': form, 'result': result, 'error_file': error_file,
+    })
+
+def product_import_errors(request, name):
+    path = os.path.join(IMPORT_ERRORS_DIR, os.path.basename(name))
+    if not name.startswith('product-import-errors-') or not os.path.exists(path):
+        raise Http404('No such error file.')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type='text/csv')
+
+# Uploaded media on the development server; thumbnail variants never change content,
+# so browsers may keep them for THUMBNAIL_CACHE_SECONDS without revalidating
+def media(request, path, document_root=None):
+    response = serve(request, path, document_root=document_root)
+    if thumbnails.is_variant(path):
+        seconds = getattr(settings, 'THUMBNAIL_CACHE_SECONDS', thumbnails.CACHE_SECONDS)
+        response['Cache-Control'] = f'public, max-age={seconds}, immutable'
+    return response
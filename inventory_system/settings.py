@@ -38,6 +38,8 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # Middleware
 MIDDLEWARE = [
+    'inventory.profiling.QueryProfilingMiddleware',
+    'inventory.routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,9 +76,62 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # keep each worker thread's connection open between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # take the write lock at BEGIN: a DEFERRED transaction that reads and
+            # then writes can fail outright instead of waiting for busy_timeout
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied to every new SQLite connection by inventory.db.configure_connection;
+# overrides inventory.db.PRAGMAS (WAL, synchronous=NORMAL, busy_timeout=5000 ms,
+# 64 MB cache_size, 256 MB mmap_size). Set a pragma to None to leave SQLite's default.
+SQLITE_PRAGMAS = {}
+
+# Read replica (inventory.routing): views marked @use_replica read from the
+# 'replica' alias when it exists. Locally, point DATABASE_REPLICA_PATH at a
+# second SQLite file and keep it in step with `manage.py sync_replica --interval 2`.
+if os.environ.get('DATABASE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['inventory.routing.PrimaryReplicaRouter']
+# after a write, that client reads from primary for this long (covers replication lag)
+REPLICA_PIN_SECONDS = 5
+
+# Cache (dashboard metrics). Use a shared backend such as Redis when running
+# several worker processes so signal-driven invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-system',
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# {% cache_for %} fragments (inventory/templatetags/fragment_cache.py). Keys carry the
+# objects' updated_at, so entries are never invalidated, only superseded; the
+# backend's eviction drops the stale ones (locmem culls least recently used).
+# FileBasedCache shares fragments between processes on one host, Redis with
+# maxmemory-policy allkeys-lru between hosts. None turns fragment caching off.
+CACHES['fragments'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'fragments',
+    'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 10},
+}
+FRAGMENT_CACHE = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Admin changelists of big tables (inventory.pagination.EstimatedCountPaginator):
+# past this many rows an unfiltered list shows an estimated count instead of COUNT(*)
+ADMIN_ESTIMATE_COUNT_THRESHOLD = 10000
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -99,6 +154,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'    # Production collectstatic files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image variants (inventory.thumbnails): generated on THUMBNAIL_WORKERS
+# background threads after an upload (0 = inline). Variant names change with
+# their content, so they are served with a year-long immutable Cache-Control;
+# in production give the web server the same rule, e.g. nginx:
+#   location ~ \.(thumb|detail)-[0-9x]+\.(webp|jpg)$ { expires 1y; add_header Cache-Control "public, immutable"; }
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_CACHE_SECONDS = 365 * 24 * 60 * 60
+
 # Authentication redirects
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
@@ -112,3 +175,22 @@ INVOICE_STORAGE_PATH = os.path.join(MEDIA_ROOT, 'invoices')
 
 # Make sure invoices folder exists
 os.makedirs(INVOICE_STORAGE_PATH, exist_ok=True)
+
+# Invoice numbers: 1 = gap-free per-day sequence; N > 1 = each process reserves N at a time
+INVOICE_NUMBER_BLOCK_SIZE = 1
+
+# Request profiling (inventory.profiling): Server-Timing headers, per-view stats
+# at /admin/profiling/, and a warning log for requests over these thresholds
+PROFILING_ENABLED = True
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_SLOW_REQUEST_MS = 500
+PROFILING_SLOW_DB_MS = 200
+PROFILING_MAX_QUERIES = 50
+PROFILING_DUPLICATE_QUERIES = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'inventory.profiling': {'handlers': ['console'], 'level': 'WARNING'}},
+}
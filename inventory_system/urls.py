@@ -4,7 +4,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
+from inventory.profiling import profiling_stats
+from inventory.views import media
+
 urlpatterns = [
+    path('admin/profiling/', profiling_stats, name='profiling-stats'),
     path('admin/', admin.site.urls),
 
     # Authentication
@@ -18,5 +22,5 @@ urlpatterns = [
 
 # Static & Media files during development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=media, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)